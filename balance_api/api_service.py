@@ -1,14 +1,43 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
+from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse, ORJSONResponse
+from typing import List, Optional, NamedTuple, Union
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text, func, select, insert, union_all, tuple_, literal, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from dotenv import load_dotenv
 import os
+import asyncio
+import base64
+import json
+import uuid
+import hashlib
 import logging
+from datetime import datetime, timedelta
 from models.BalanceOperationCreate import BalanceOperationCreate
 from models.BalanceOperation import BalanceOperation
 from models.TransactionCreate import TransactionCreate
+from models.MultiTransactionCreate import MultiTransactionCreate
+from models.AccrualRunCreate import AccrualRunCreate
+from models.AccrualRun import AccrualRun
+from models.BalanceBulkRequest import BalanceBulkRequest
+from models.BalanceBatchCreate import BalanceBatchCreate
+from models.ClientBalance import ClientBalance
+from models.BalanceOperationArchive import BalanceOperationArchive
+from models.BalanceCheckpoint import BalanceCheckpoint
+from models.BalanceTransaction import BalanceTransaction
+from models.IdempotencyKey import IdempotencyKey
+from models.BalanceOperationResponse import BalanceOperationResponse, BalanceOperationPage
+from models.TransactionResponse import TransactionResponse
+from models.MultiTransactionResponse import MultiTransactionResponse
+from models.BalanceTransactionResponse import BalanceTransactionResponse
+from models.DebitResponse import DebitResponse
+from models.UserBalanceResponse import UserBalanceResponse, BulkBalanceResponse
+from shared.ttl_cache import TTLCache
+from shared.database import Database
+from tools.group_commit import GroupCommitter
+from tools.reconciliation import run_reconciliation, reconciliation_report, CHECKS
+from tools.accrual import start_accrual_run, preview_accrual, run_accrual, accrual_summary, DEFAULT_DESCRIPTIONS, COMPLETED
 
 load_dotenv()
 
@@ -19,97 +48,1141 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+COMPACTION_INTERVAL_SECONDS = int(os.getenv("COMPACTION_INTERVAL_SECONDS", 3600))
+COMPACTION_RETENTION_DAYS = int(os.getenv("COMPACTION_RETENTION_DAYS", 90))
+COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", 5000))
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", 3))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 1000))
+LEADERBOARD_CACHE_TTL_SECONDS = float(os.getenv("LEADERBOARD_CACHE_TTL_SECONDS", 30))
+LEADERBOARD_MAX_LIMIT = 100
+OPERATIONS_MAX_LIMIT = 500
+MULTI_TRANSFER_MAX_RECEIVERS = int(os.getenv("MULTI_TRANSFER_MAX_RECEIVERS", 100))
+CHANGES_MAX_LIMIT = 1000
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+CHANGES_SEQUENCER_INTERVAL_SECONDS = float(os.getenv("CHANGES_SEQUENCER_INTERVAL_SECONDS", 1))
+CHANGES_SEQUENCER_BATCH_SIZE = 10000
+# pg advisory lock key that keeps sequencer runs (across all balance_api instances) one at a time
+CHANGES_SEQUENCER_LOCK_KEY = 7301001
+HISTORY_CACHE_TTL_SECONDS = float(os.getenv("HISTORY_CACHE_TTL_SECONDS", 3600))
+HISTORY_MAX_DAYS = 365
+RECONCILIATION_INTERVAL_SECONDS = float(os.getenv("RECONCILIATION_INTERVAL_SECONDS", 60))
+RECONCILIATION_CHUNK_SIZE = int(os.getenv("RECONCILIATION_CHUNK_SIZE", 1000))
+# Rows younger than this are left for a later run, so writes still in flight are not reported
+RECONCILIATION_SETTLE_SECONDS = int(os.getenv("RECONCILIATION_SETTLE_SECONDS", 300))
+RECONCILIATION_REPORT_MAX_LIMIT = 1000
+ACCRUAL_CHUNK_SIZE = int(os.getenv("ACCRUAL_CHUNK_SIZE", 5000))
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", 24))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = 3600
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", 5))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 100))
+DB_MODE = os.getenv("DB_MODE", "sync")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
 
-app = FastAPI()
+database = Database(
+    DATABASE_URL,
+    mode=DB_MODE,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=DB_POOL_PRE_PING
+)
 
-@app.post("/balance/add")
-def add_balance_operation(op: BalanceOperationCreate):
-    logger.info(f"Adding balance for client {op.clientId}: +{op.amount} ({op.description})")
-    db: Session = SessionLocal()
+# orjson renders the (already validated) response bodies far faster than the stdlib encoder
+app = FastAPI(default_response_class=ORJSONResponse)
+
+async def get_db():
+    async with database.session() as session:
+        yield session
+
+leaderboard_cache = TTLCache(LEADERBOARD_CACHE_TTL_SECONDS)
+# Keyed by (clientId, UTC date) so a cached series never runs past the day it was built on
+history_cache = TTLCache(HISTORY_CACHE_TTL_SECONDS)
+
+def balance_deltas(ops) -> dict:
+    """Net amount per client for a set of operations about to be written."""
+    deltas = {}
+    for op in ops:
+        deltas[op.clientId] = deltas.get(op.clientId, 0) + op.amount
+    return deltas
+
+def apply_balance_deltas(db: Session, deltas: dict):
+    """Fold deltas into client_balance; must run in the same transaction as the operation inserts."""
+    if not deltas:
+        return
+    # Sorted so concurrent writers touching the same clients always lock rows in the same order
+    rows = [{"clientId": client_id, "balance": deltas[client_id]} for client_id in sorted(deltas)]
+    stmt = pg_insert(ClientBalance).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ClientBalance.clientId],
+        set_={"balance": ClientBalance.balance + stmt.excluded.balance, "updatedAt": text("now()")}
+    )
+    db.execute(stmt)
+
+def operation_row(op: BalanceOperation) -> dict:
+    """Response fields of a just-written operation, read straight off the instance.
+
+    Cheaper than letting jsonable_encoder introspect the ORM object, and it never touches
+    unloaded attributes (seq is only assigned later by the sequencer).
+    """
+    return {
+        "id": op.id,
+        "clientId": op.clientId,
+        "amount": op.amount,
+        "description": op.description,
+        "createdAt": op.createdAt,
+        "updatedAt": op.updatedAt,
+        "transactionId": op.transactionId
+    }
+
+def canonical_client_id(client_id: str) -> str:
+    """The lowercase, hyphenated form Postgres returns uuids in; 400 if client_id is not a UUID."""
     try:
-        balance_op = BalanceOperation(
-            clientId=op.clientId,
-            amount=abs(op.amount),
-            description=op.description
+        return str(uuid.UUID(client_id))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail=f"Invalid client id: {client_id}")
+
+def lock_client_balances(db: Session, client_ids) -> dict:
+    """Row-lock the balances of client_ids for the rest of the transaction and return them.
+
+    Missing rows are created at zero first so there is always a row to lock. Locks are taken
+    in clientId order, the same order apply_balance_deltas uses, so two transfers between the
+    same pair of clients cannot deadlock. The result is keyed by canonical_client_id.
+    """
+    ids = sorted({canonical_client_id(client_id) for client_id in client_ids})
+    db.execute(pg_insert(ClientBalance).values([{"clientId": c, "balance": 0} for c in ids]).on_conflict_do_nothing())
+    rows = (
+        db.query(ClientBalance.clientId, ClientBalance.balance)
+        .filter(ClientBalance.clientId.in_(ids))
+        .order_by(ClientBalance.clientId)
+        .with_for_update()
+        .all()
+    )
+    return {str(client_id): balance for client_id, balance in rows}
+
+def insufficient_funds(client_id: str, balance: int, required: int) -> HTTPException:
+    logger.warning(f"Insufficient balance for client {client_id}: has {balance}, needs {required}")
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Insufficient balance", "balance": balance, "required": required}
+    )
+
+def claim_idempotency_key(db: Session, key: Optional[str], endpoint: str, payload) -> Optional[JSONResponse]:
+    """Reserve an Idempotency-Key inside the current transaction.
+
+    Returns None when the request should run, or the stored response when the key was already
+    used. A concurrent request with the same key blocks on the key's primary key until the first
+    one commits (and then replays it) or rolls back (and then runs itself).
+    """
+    if key is None:
+        return None
+    request_hash = hashlib.sha256(json.dumps(jsonable_encoder(payload), sort_keys=True).encode()).hexdigest()
+    now = datetime.utcnow()
+    values = {
+        "key": key,
+        "endpoint": endpoint,
+        "requestHash": request_hash,
+        "createdAt": now,
+        "expiresAt": now + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    }
+    stmt = pg_insert(IdempotencyKey).values(**values)
+    # An expired key that hasn't been purged yet is reused as if it were new. expiresAt is naive UTC,
+    # so it is compared with a naive UTC value rather than now(), which would depend on the session TimeZone.
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key],
+        set_={**values, "statusCode": None, "response": None},
+        where=IdempotencyKey.expiresAt < now
+    ).returning(IdempotencyKey.key)
+    if db.execute(stmt).first():
+        return None
+    existing = db.get(IdempotencyKey, key)
+    if existing.endpoint != endpoint or existing.requestHash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    logger.info(f"Replaying stored response for Idempotency-Key {key}")
+    return JSONResponse(status_code=existing.statusCode, content=existing.response, headers={"Idempotent-Replayed": "true"})
+
+def store_idempotent_response(db: Session, key: Optional[str], body, status_code: int = 200):
+    """Save the response for key; must run before the write's commit so both land together."""
+    body = jsonable_encoder(body)
+    if key is not None:
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update(
+            {"statusCode": status_code, "response": body}, synchronize_session=False
         )
-        db.add(balance_op)
-        db.commit()
-        db.refresh(balance_op)
-        logger.info(f"Successfully added balance operation: {balance_op.id}")
-        return balance_op
-    finally:
-        db.close()
-
-@app.post("/balance/subtract")
-def subtract_balance_operation(op: BalanceOperationCreate):
-    logger.info(f"Subtracting balance for client {op.clientId}: -{abs(op.amount)} ({op.description})")
-    db: Session = SessionLocal()
+    return body
+
+class BalanceWrite(NamedTuple):
+    """One /balance/add or /balance/subtract request; client_id is canonical and amount already carries its sign."""
+    endpoint: str
+    op: BalanceOperationCreate
+    client_id: str
+    amount: int
+    idempotency_key: Optional[str]
+
+def write_balance_operations(db: Session, writes) -> list:
+    """Apply add/subtract requests in one transaction: one multi-row insert, one commit.
+
+    Returns one result per write: its response body, a replayed JSONResponse, an HTTPException
+    for that write alone, or None when it has to be retried on its own (a second use of an
+    Idempotency-Key already claimed earlier in the same batch, which can only be replayed once
+    the first one has committed).
+    """
+    results = [None] * len(writes)
+    balance_ops = {}
+    claimed_keys = set()
+    for i, write in enumerate(writes):
+        if write.idempotency_key is not None and write.idempotency_key in claimed_keys:
+            continue
+        try:
+            replay = claim_idempotency_key(db, write.idempotency_key, write.endpoint, write.op)
+        except HTTPException as e:
+            results[i] = e
+            continue
+        claimed_keys.add(write.idempotency_key)
+        if replay:
+            results[i] = replay
+            continue
+        balance_ops[i] = BalanceOperation(
+            clientId=write.client_id, amount=write.amount, description=write.op.description, reference=write.op.reference
+        )
+    if balance_ops:
+        db.add_all(balance_ops.values())
+        apply_balance_deltas(db, balance_deltas(balance_ops.values()))
+        db.flush()
+        for i, balance_op in balance_ops.items():
+            results[i] = store_idempotent_response(db, writes[i].idempotency_key, operation_row(balance_op))
+    db.commit()
+    if balance_ops:
+        on_balances_changed([balance_op.clientId for balance_op in balance_ops.values()])
+        logger.info(f"Wrote {len(balance_ops)} balance operations in one commit")
+    return results
+
+async def flush_balance_writes(writes) -> list:
+    """GroupCommitter flush: the whole group in one transaction, falling back to one transaction each.
+
+    The fallback keeps one bad write from failing everybody else's.
+    """
+    try:
+        results = await database.run(write_balance_operations, writes)
+    except Exception as e:
+        logger.warning(f"Group commit of {len(writes)} balance writes failed, retrying individually: {e}")
+        results = [None] * len(writes)
+    for i, result in enumerate(results):
+        if result is None:
+            try:
+                results[i] = (await database.run(write_balance_operations, [writes[i]]))[0]
+            except Exception as e:
+                results[i] = e
+    return results
+
+group_committer = GroupCommitter(flush_balance_writes, GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH) if GROUP_COMMIT_ENABLED else None
+
+async def submit_balance_write(write: BalanceWrite, session):
+    if group_committer:
+        result = await group_committer.submit(write)
+    else:
+        result = (await session.run(write_balance_operations, [write]))[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def purge_idempotency_keys(db: Session) -> int:
+    deleted = db.query(IdempotencyKey).filter(IdempotencyKey.expiresAt < datetime.utcnow()).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def on_balances_changed(client_ids):
+    """Drop cached reads derived from balances; call after the write has committed."""
+    leaderboard_cache.invalidate()
+    if client_ids is None:
+        history_cache.invalidate()
+        return
+    today = datetime.utcnow().date()
+    for client_id in set(client_ids):
+        history_cache.invalidate((str(client_id), today))
+
+# Every ledger column, in model order, so the archive copy keeps up with schema changes
+LEDGER_COLUMNS = ", ".join(f'"{column.name}"' for column in BalanceOperation.__table__.columns)
+
+# Hot operations plus everything already folded into the client's checkpoint
+LEDGER_TOTALS_SQL = (
+    'SELECT "clientId", SUM("total") AS "total" FROM ('
+    'SELECT "clientId", SUM("amount") AS "total" FROM balance_operation GROUP BY "clientId" '
+    'UNION ALL SELECT "clientId", "balance" AS "total" FROM balance_checkpoint'
+    ') ledger GROUP BY "clientId"'
+)
+
+def encode_cursor(created_at: datetime, op_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), str(op_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str):
     try:
-        op.amount = -abs(op.amount)
-        balance_op = BalanceOperation(**op.dict())
+        created_at, op_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(uuid.UUID(op_id))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def ledger_select(model, *conditions):
+    """Select the common operation columns from balance_operation or its archive."""
+    return select(
+        model.id, model.clientId, model.amount, model.description, model.createdAt, model.updatedAt, model.seq,
+        model.transactionId
+    ).where(*conditions)
+
+# Daily closing balance for one client: per-day net over hot and archived operations, densified with
+# generate_series so days without activity carry the previous balance, then a running SUM() OVER.
+BALANCE_HISTORY_SQL = (
+    'WITH ledger AS ('
+    '  SELECT "amount", "createdAt" FROM balance_operation WHERE "clientId" = :client_id '
+    '  UNION ALL SELECT "amount", "createdAt" FROM balance_operation_archive WHERE "clientId" = :client_id'
+    '), daily AS ('
+    '  SELECT "createdAt"::date AS "day", SUM("amount") AS "net" FROM ledger GROUP BY 1'
+    '), series AS ('
+    '  SELECT d::date AS "day", COALESCE(daily."net", 0)::bigint AS "net", '
+    '  SUM(COALESCE(daily."net", 0)) OVER (ORDER BY d)::bigint AS "balance" '
+    '  FROM generate_series((SELECT MIN("day") FROM daily), CAST(:today AS date), interval \'1 day\') d '
+    '  LEFT JOIN daily ON daily."day" = d::date'
+    ') SELECT "day", "net", "balance" FROM series WHERE "day" > CAST(:today AS date) - CAST(:days AS integer) ORDER BY "day"'
+)
+
+def ndjson_line(row) -> str:
+    return json.dumps(dict(row), default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value)) + "\n"
+
+# CTE tail shared by row compaction and partition archival: copies the rows of a preceding "moved"
+# CTE into the archive and folds them into each client's checkpoint. Leaves an "archived" CTE.
+ARCHIVE_AND_CHECKPOINT_SQL = (
+    'archived AS ('
+    f'  INSERT INTO balance_operation_archive ({LEDGER_COLUMNS}) SELECT {LEDGER_COLUMNS} FROM moved '
+    '  RETURNING "clientId", "amount", "createdAt"'
+    '), checkpoint AS ('
+    '  INSERT INTO balance_checkpoint '
+    '  ("clientId", "balance", "totalIncome", "totalExpense", "operationCount", "cutoff", "updatedAt") '
+    '  SELECT "clientId", SUM("amount"), '
+    '  COALESCE(SUM("amount") FILTER (WHERE "amount" > 0), 0), '
+    '  COALESCE(-SUM("amount") FILTER (WHERE "amount" < 0), 0), '
+    '  COUNT(*), MAX("createdAt"), now() '
+    '  FROM archived GROUP BY "clientId" '
+    '  ON CONFLICT ("clientId") DO UPDATE SET '
+    '  "balance" = balance_checkpoint."balance" + EXCLUDED."balance", '
+    '  "totalIncome" = balance_checkpoint."totalIncome" + EXCLUDED."totalIncome", '
+    '  "totalExpense" = balance_checkpoint."totalExpense" + EXCLUDED."totalExpense", '
+    '  "operationCount" = balance_checkpoint."operationCount" + EXCLUDED."operationCount", '
+    '  "cutoff" = GREATEST(balance_checkpoint."cutoff", EXCLUDED."cutoff"), '
+    '  "updatedAt" = now()'
+    ')'
+)
+
+def compact_ledger_batch(db: Session, cutoff: datetime, batch_size: int) -> dict:
+    """Move up to batch_size operations older than cutoff into the archive and fold them into checkpoints.
+
+    Delete, archive and checkpoint happen in one statement, so a concurrent reader sees each
+    operation either in the hot table or in the checkpoint, never both or neither.
+    """
+    result = db.execute(text(
+        'WITH moved AS ('
+        '  DELETE FROM balance_operation WHERE ("id", "createdAt") IN ('
+        '    SELECT "id", "createdAt" FROM balance_operation WHERE "createdAt" < :cutoff AND "seq" IS NOT NULL '
+        '    ORDER BY "createdAt" LIMIT :batch_size FOR UPDATE SKIP LOCKED'
+        f'  ) RETURNING {LEDGER_COLUMNS}'
+        f'), {ARCHIVE_AND_CHECKPOINT_SQL} '
+        'SELECT COUNT(DISTINCT "clientId") AS "clients", COUNT(*) AS "operations" FROM archived'
+    ), {"cutoff": cutoff, "batch_size": batch_size}).mappings().one()
+    db.commit()
+    return {"clients": result["clients"], "operations": result["operations"]}
+
+def add_months(month, count: int):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+def detach_partition(db: Session, partition: str, pending: bool):
+    """Detach partition from balance_operation without blocking the ledger's readers and writers.
+
+    A plain DETACH or DROP needs an ACCESS EXCLUSIVE lock on balance_operation, and every query
+    on the ledger queues behind it while it waits for long readers such as an export stream.
+    DETACH ... CONCURRENTLY only takes a SHARE UPDATE EXCLUSIVE lock and waits for the
+    transactions still using the partition. It cannot run inside a transaction block, so it
+    gets an autocommit connection. A detach interrupted halfway (pending) is completed with FINALIZE.
+    """
+    db.commit()
+    connection = db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    action = "FINALIZE" if pending else "CONCURRENTLY"
+    connection.execute(text(f'ALTER TABLE balance_operation DETACH PARTITION "{partition}" {action}'))
+    db.commit()
+
+def archive_partition(db: Session, partition: str, attached: bool = True, pending: bool = False) -> Optional[int]:
+    """Archive and checkpoint every row of one monthly partition, then drop it.
+
+    Bulk-copying a whole month and dropping its table avoids the row-by-row deletes (and the
+    bloat they leave) of compact_ledger_batch. The partition is detached first, so the copy and
+    the drop only lock the detached table. From the detach until the archive commits, the
+    month's operations are in neither the hot table nor the archive. Balances are not affected,
+    because they come from client_balance. Returns None, changing nothing, when some rows are
+    not sequenced yet.
+    """
+    if attached:
+        # Once detached, the sequencer no longer sees the rows, so they must all be numbered already
+        if db.execute(text(f'SELECT 1 FROM "{partition}" WHERE "seq" IS NULL LIMIT 1')).first():
+            db.rollback()
+            return None
+        detach_partition(db, partition, pending)
+    archived = db.execute(text(
+        f'WITH moved AS (SELECT {LEDGER_COLUMNS} FROM "{partition}"), {ARCHIVE_AND_CHECKPOINT_SQL} '
+        'SELECT COUNT(*) FROM archived'
+    )).scalar()
+    db.execute(text(f'DROP TABLE "{partition}"'))
+    db.commit()
+    return archived
+
+def create_partitions(db: Session) -> List[str]:
+    """Create the monthly partitions for this month and the next PARTITION_PREMAKE_MONTHS."""
+    this_month = datetime.utcnow().date().replace(day=1)
+    created = []
+    for offset in range(PARTITION_PREMAKE_MONTHS + 1):
+        month = add_months(this_month, offset)
+        if db.execute(text("SELECT balance_operation_ensure_partition(:month)"), {"month": month}).scalar():
+            created.append(month.strftime("%Y-%m"))
+    db.commit()
+    return created
+
+def maintain_partitions(db: Session, retention_days: int = COMPACTION_RETENTION_DAYS) -> dict:
+    """Create the monthly partitions for the coming months and archive months past the retention window.
+
+    Only months that end before the cutoff are archived whole; the rest of the window is left
+    to compact_ledger's row batches. A month left detached but not archived by an earlier run
+    is archived regardless of the cutoff.
+    """
+    created = create_partitions(db)
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    # Attached, detach-pending and already detached month tables alike
+    partitions = db.execute(text(
+        "SELECT c.relname, i.inhrelid IS NOT NULL AS attached, COALESCE(i.inhdetachpending, false) AS pending "
+        "FROM pg_class c LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = 'balance_operation'::regclass "
+        "WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace "
+        "AND c.relname ~ '^balance_operation_p[0-9]{6}$' ORDER BY 1"
+    )).mappings().all()
+    db.commit()
+    archived, skipped = {}, []
+    for partition in partitions:
+        name = partition["relname"]
+        month = datetime.strptime(name[len("balance_operation_p"):], "%Y%m").date()
+        if partition["attached"] and datetime.combine(add_months(month, 1), datetime.min.time()) > cutoff:
+            continue
+        try:
+            operations = archive_partition(db, name, partition["attached"], partition["pending"])
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not archive partition {name}: {e}")
+            operations = None
+        if operations is None:
+            skipped.append(name)
+        else:
+            archived[name] = operations
+    return {"created": created, "archived": archived, "skipped": skipped}
+
+def sequence_operations(db: Session, batch_size: int = CHANGES_SEQUENCER_BATCH_SIZE) -> int:
+    """Give change-feed sequence numbers to operations whose writing transaction has finished.
+
+    A sequence drawn at insert time would not be safe to page by: a transaction that took seq 10
+    can commit after one that took seq 11, and a consumer already past 11 would never see 10.
+    Instead each row records its txid, and only rows older than the oldest running transaction
+    (pg_snapshot_xmin) are numbered, by one sequencer at a time. Everything numbered is therefore
+    committed and nothing can later appear below the highest number handed out.
+    """
+    locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": CHANGES_SEQUENCER_LOCK_KEY}).scalar()
+    if not locked:
+        db.rollback()
+        return 0
+    result = db.execute(text(
+        'UPDATE balance_operation o SET "seq" = s."seq" FROM ('
+        '  SELECT "id", nextval(\'balance_operation_seq\') AS "seq" FROM ('
+        '    SELECT "id" FROM balance_operation '
+        '    WHERE "seq" IS NULL AND "txid" < pg_snapshot_xmin(pg_current_snapshot())::text::bigint '
+        '    ORDER BY "txid", "id" LIMIT :batch_size'
+        '  ) pending'
+        ') s WHERE o."id" = s."id"'
+    ), {"batch_size": batch_size})
+    db.commit()
+    return result.rowcount
+
+def compact_ledger(db: Session, retention_days: int = COMPACTION_RETENTION_DAYS, max_batches: int = 100) -> dict:
+    """Run compaction batches until nothing older than the retention window is left (or max_batches)."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    compacted = {"cutoff": cutoff.isoformat(), "batches": 0, "operations": 0}
+    for _ in range(max_batches):
+        batch = compact_ledger_batch(db, cutoff, COMPACTION_BATCH_SIZE)
+        if batch["operations"] == 0:
+            break
+        compacted["batches"] += 1
+        compacted["operations"] += batch["operations"]
+    return compacted
+
+async def compaction_loop():
+    while True:
+        await asyncio.sleep(COMPACTION_INTERVAL_SECONDS)
+        try:
+            partitions = await database.run(maintain_partitions)
+            if partitions["created"] or partitions["archived"]:
+                logger.info(f"Partition maintenance created {partitions['created']}, archived {partitions['archived']}")
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {e}")
+        try:
+            compacted = await database.run(compact_ledger)
+            logger.info(f"Ledger compaction moved {compacted['operations']} operations to the archive "
+                        f"in {compacted['batches']} batches (cutoff {compacted['cutoff']})")
+        except Exception as e:
+            logger.error(f"Ledger compaction failed: {e}")
+
+async def sequencer_loop():
+    while True:
+        await asyncio.sleep(CHANGES_SEQUENCER_INTERVAL_SECONDS)
+        try:
+            await database.run(sequence_operations)
+        except Exception as e:
+            logger.error(f"Change feed sequencing failed: {e}")
+
+async def reconciliation_loop():
+    while True:
+        await asyncio.sleep(RECONCILIATION_INTERVAL_SECONDS)
+        try:
+            await database.run(run_reconciliation, RECONCILIATION_CHUNK_SIZE, RECONCILIATION_SETTLE_SECONDS)
+        except Exception as e:
+            logger.error(f"Ledger reconciliation failed: {e}")
+
+async def idempotency_purge_loop():
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+        try:
+            deleted = await database.run(purge_idempotency_keys)
+            logger.info(f"Purged {deleted} expired idempotency keys")
+        except Exception as e:
+            logger.error(f"Idempotency key purge failed: {e}")
+
+@app.on_event("startup")
+async def start_background_jobs():
+    # Without a default partition, writes need this month's partition even when compaction never runs
+    try:
+        created = await database.run(create_partitions)
+        if created:
+            logger.info(f"Created balance_operation partitions {created}")
+    except Exception as e:
+        logger.error(f"Creating partitions failed: {e}")
+    if COMPACTION_INTERVAL_SECONDS > 0:
+        app.state.compaction_task = asyncio.create_task(compaction_loop())
+    app.state.idempotency_purge_task = asyncio.create_task(idempotency_purge_loop())
+    if CHANGES_SEQUENCER_INTERVAL_SECONDS > 0:
+        app.state.sequencer_task = asyncio.create_task(sequencer_loop())
+    if RECONCILIATION_INTERVAL_SECONDS > 0:
+        app.state.reconciliation_task = asyncio.create_task(reconciliation_loop())
+
+@app.post("/balance/add", response_model=BalanceOperationResponse)
+async def add_balance_operation(op: BalanceOperationCreate, idempotency_key: Optional[str] = Header(None), session=Depends(get_db)):
+    logger.info(f"Adding balance for client {op.clientId}: +{op.amount} ({op.description})")
+    return await submit_balance_write(BalanceWrite("/balance/add", op, canonical_client_id(op.clientId), abs(op.amount), idempotency_key), session)
+
+@app.post("/balance/subtract", response_model=BalanceOperationResponse)
+async def subtract_balance_operation(op: BalanceOperationCreate, idempotency_key: Optional[str] = Header(None), session=Depends(get_db)):
+    logger.info(f"Subtracting balance for client {op.clientId}: -{abs(op.amount)} ({op.description})")
+    return await submit_balance_write(BalanceWrite("/balance/subtract", op, canonical_client_id(op.clientId), -abs(op.amount), idempotency_key), session)
+
+@app.post("/balance/debit", response_model=DebitResponse)
+async def debit_balance_operation(op: BalanceOperationCreate, idempotency_key: Optional[str] = Header(None), session=Depends(get_db)):
+    """Subtract only if the client can afford it; the check and the write share one row lock."""
+    logger.info(f"Debiting client {op.clientId}: -{abs(op.amount)} ({op.description})")
+    if op.amount == 0:
+        raise HTTPException(status_code=400, detail="Debit amount must be positive")
+    client_id = canonical_client_id(op.clientId)
+
+    def work(db: Session):
+        replay = claim_idempotency_key(db, idempotency_key, "/balance/debit", op)
+        if replay:
+            return replay
+        amount = abs(op.amount)
+        balance = lock_client_balances(db, [client_id])[client_id]
+        if balance < amount:
+            raise insufficient_funds(client_id, balance, amount)
+        balance_op = BalanceOperation(clientId=client_id, amount=-amount, description=op.description, reference=op.reference)
         db.add(balance_op)
+        apply_balance_deltas(db, balance_deltas([balance_op]))
+        db.flush()
+        body = store_idempotent_response(db, idempotency_key, {"operation": operation_row(balance_op), "balance": balance - amount})
         db.commit()
-        db.refresh(balance_op)
-        logger.info(f"Successfully subtracted balance operation: {balance_op.id}")
-        return balance_op
-    finally:
-        db.close()
-
-@app.post("/balance/transaction")
-def create_transaction(transaction: TransactionCreate):
+        on_balances_changed([balance_op.clientId])
+        logger.info(f"Successfully debited balance operation: {balance_op.id}")
+        return body
+
+    return await session.run(work)
+
+@app.post("/balance/transaction", response_model=TransactionResponse)
+async def create_transaction(transaction: TransactionCreate, idempotency_key: Optional[str] = Header(None), session=Depends(get_db)):
     logger.info(f"Creating transaction: {transaction.senderId} -> {transaction.receiverId}, amount: {transaction.amount}")
-    db: Session = SessionLocal()
-    try:
-        if transaction.senderId == transaction.receiverId:
-            logger.warning(f"Transaction failed: sender and receiver are the same ({transaction.senderId})")
-            raise HTTPException(status_code=400, detail="Sender and receiver cannot be the same")
+    # Compared and used as keys in canonical form, so differently written ids of one client are the same id
+    sender_id = canonical_client_id(transaction.senderId)
+    receiver_id = canonical_client_id(transaction.receiverId)
+    if sender_id == receiver_id:
+        logger.warning(f"Transaction failed: sender and receiver are the same ({sender_id})")
+        raise HTTPException(status_code=400, detail="Sender and receiver cannot be the same")
 
+    def work(db: Session):
+        replay = claim_idempotency_key(db, idempotency_key, "/balance/transaction", transaction)
+        if replay:
+            return replay
+
+        balances = lock_client_balances(db, [sender_id, receiver_id])
+        sender_balance = balances[sender_id]
+        if sender_balance < abs(transaction.amount):
+            raise insufficient_funds(sender_id, sender_balance, abs(transaction.amount))
+
+        # Both legs carry the transaction's id, so a transfer is found by index rather than by description
+        transaction_record = BalanceTransaction(
+            senderId=sender_id, amount=abs(transaction.amount), description=transaction.description
+        )
+        db.add(transaction_record)
+        db.flush()
         sender_op = BalanceOperation(
-            clientId=transaction.senderId,
+            clientId=sender_id,
             amount=-abs(transaction.amount),
-            description=f"Transaction to {transaction.receiverId}: {transaction.description}"
+            description=f"Transaction to {receiver_id}: {transaction.description}",
+            transactionId=transaction_record.id
         )
         receiver_op = BalanceOperation(
-            clientId=transaction.receiverId,
+            clientId=receiver_id,
             amount=abs(transaction.amount),
-            description=f"Transaction from {transaction.senderId}: {transaction.description}"
+            description=f"Transaction from {sender_id}: {transaction.description}",
+            transactionId=transaction_record.id
         )
         db.add(sender_op)
         db.add(receiver_op)
+        apply_balance_deltas(db, balance_deltas([sender_op, receiver_op]))
+        db.flush()
+        body = store_idempotent_response(db, idempotency_key, {
+            "transactionId": transaction_record.id,
+            "sender": operation_row(sender_op),
+            "receiver": operation_row(receiver_op),
+            "senderBalance": sender_balance - abs(transaction.amount)
+        })
         db.commit()
-        db.refresh(sender_op)
-        db.refresh(receiver_op)
-        
-        logger.info(f"Successfully created transaction: {sender_op.id} and {receiver_op.id}")
-        return {"sender": sender_op, "receiver": receiver_op}
+        on_balances_changed([sender_op.clientId, receiver_op.clientId])
 
-    finally:
-        db.close()
+        logger.info(f"Successfully created transaction {transaction_record.id}: {sender_op.id} and {receiver_op.id}")
+        return body
 
-@app.get("/balance/{user_id}")
-def get_user_balance(user_id: str):
-    logger.info(f"Getting balance for user: {user_id}")
-    db: Session = SessionLocal()
+    return await session.run(work)
+
+@app.post("/balance/transaction/multi", response_model=MultiTransactionResponse)
+async def create_multi_transaction(transaction: MultiTransactionCreate, idempotency_key: Optional[str] = Header(None), session=Depends(get_db)):
+    """Debit the sender once and credit every receiver, all in one database transaction."""
+    logger.info(f"Creating transaction: {transaction.senderId} -> {len(transaction.receivers)} receivers")
+    if not transaction.receivers:
+        raise HTTPException(status_code=400, detail="Transaction must have at least one receiver")
+    if len(transaction.receivers) > MULTI_TRANSFER_MAX_RECEIVERS:
+        raise HTTPException(status_code=400, detail=f"Transaction can have at most {MULTI_TRANSFER_MAX_RECEIVERS} receivers")
+    # Canonical ids, as for /balance/transaction, so the checks below and the balance lookups agree
+    sender_id = canonical_client_id(transaction.senderId)
+    receiver_ids = [canonical_client_id(r.receiverId) for r in transaction.receivers]
+    if sender_id in receiver_ids:
+        raise HTTPException(status_code=400, detail="Sender and receiver cannot be the same")
+    if len(set(receiver_ids)) != len(receiver_ids):
+        raise HTTPException(status_code=400, detail="Each receiver can only appear once")
+    if any(r.amount <= 0 for r in transaction.receivers):
+        raise HTTPException(status_code=400, detail="Amounts must be positive")
+    total = sum(r.amount for r in transaction.receivers)
+
+    def work(db: Session):
+        replay = claim_idempotency_key(db, idempotency_key, "/balance/transaction/multi", transaction)
+        if replay:
+            return replay
+
+        balances = lock_client_balances(db, [sender_id, *receiver_ids])
+        sender_balance = balances[sender_id]
+        if sender_balance < total:
+            raise insufficient_funds(sender_id, sender_balance, total)
+
+        transaction_record = BalanceTransaction(
+            senderId=sender_id, amount=total, description=transaction.description
+        )
+        db.add(transaction_record)
+        db.flush()
+        sender_op = BalanceOperation(
+            clientId=sender_id,
+            amount=-total,
+            description=f"Transaction to {len(receiver_ids)} receivers: {transaction.description}",
+            transactionId=transaction_record.id
+        )
+        receiver_ops = [
+            BalanceOperation(
+                clientId=receiver_id,
+                amount=r.amount,
+                description=f"Transaction from {sender_id}: {transaction.description}",
+                transactionId=transaction_record.id
+            )
+            for receiver_id, r in zip(receiver_ids, transaction.receivers)
+        ]
+        db.add_all([sender_op, *receiver_ops])
+        apply_balance_deltas(db, balance_deltas([sender_op, *receiver_ops]))
+        db.flush()
+        body = store_idempotent_response(db, idempotency_key, {
+            "transactionId": transaction_record.id,
+            "sender": operation_row(sender_op),
+            "receivers": [operation_row(op) for op in receiver_ops],
+            "senderBalance": sender_balance - total
+        })
+        db.commit()
+        on_balances_changed([sender_id, *receiver_ids])
+
+        logger.info(f"Successfully created transaction {transaction_record.id}: {total} to {len(receiver_ids)} receivers")
+        return body
+
+    return await session.run(work)
+
+@app.get("/balance/transaction/{transaction_id}", response_model=BalanceTransactionResponse)
+async def get_transaction(transaction_id: str, session=Depends(get_db)):
+    logger.info(f"Getting transaction: {transaction_id}")
     try:
-        ops = db.query(BalanceOperation).filter(BalanceOperation.clientId == user_id).with_entities(BalanceOperation.amount)
-        balance = sum([op.amount for op in ops])
-        logger.info(f"User {user_id} balance: {balance}")
-        return {"user_id": user_id, "balance": balance}
-    finally:
-        db.close()
-
-@app.get("/balance/operations/{user_id}")
-def get_user_operations(user_id: str):
+        uuid.UUID(transaction_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+
+    def work(db: Session):
+        record = db.get(BalanceTransaction, transaction_id)
+        if record is None:
+            return None
+        legs = []
+        for model in (BalanceOperation, BalanceOperationArchive):
+            legs += [dict(row) for row in db.execute(ledger_select(model, model.transactionId == transaction_id)).mappings()]
+        return {
+            "id": record.id,
+            "senderId": record.senderId,
+            "amount": record.amount,
+            "description": record.description,
+            "createdAt": record.createdAt,
+            "legs": sorted(legs, key=lambda leg: leg["amount"])
+        }
+
+    result = await session.run(work)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return result
+
+@app.post("/balance/batch")
+async def create_batch_operations(batch: BalanceBatchCreate, idempotency_key: Optional[str] = Header(None), session=Depends(get_db)):
+    logger.info(f"Creating batch of {len(batch.operations)} balance operations")
+    if not batch.operations:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one operation")
+    # Canonical ids: two spellings of one client must fold into one client_balance row, locked in
+    # the same order lock_client_balances uses
+    client_ids = [canonical_client_id(op.clientId) for op in batch.operations]
+
+    def work(db: Session):
+        replay = claim_idempotency_key(db, idempotency_key, "/balance/batch", batch)
+        if replay:
+            return replay
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "clientId": client_id,
+                "amount": abs(op.amount) if op.type == "add" else -abs(op.amount),
+                "description": op.description,
+                "reference": op.reference
+            }
+            for client_id, op in zip(client_ids, batch.operations)
+        ]
+        # One multi-row insert and one commit for the whole batch: all operations land or none do
+        db.execute(insert(BalanceOperation), rows)
+        deltas = {}
+        for row in rows:
+            deltas[row["clientId"]] = deltas.get(row["clientId"], 0) + row["amount"]
+        apply_balance_deltas(db, deltas)
+        body = store_idempotent_response(db, idempotency_key, {
+            "count": len(rows),
+            "operations": [{"id": row["id"], "clientId": row["clientId"], "amount": row["amount"]} for row in rows]
+        })
+        db.commit()
+        on_balances_changed(set(client_ids))
+        logger.info(f"Successfully created batch of {len(rows)} balance operations")
+        return body
+
+    return await session.run(work)
+
+@app.post("/balance/bulk", response_model=BulkBalanceResponse)
+async def get_bulk_balances(request: BalanceBulkRequest, session=Depends(get_db)):
+    # dict.fromkeys keeps the caller's order while dropping duplicates
+    client_ids = list(dict.fromkeys(request.clientIds))
+    logger.info(f"Getting balances for {len(client_ids)} clients")
+
+    def work(db: Session):
+        balances = dict.fromkeys(client_ids, 0)
+        for start in range(0, len(client_ids), BULK_CHUNK_SIZE):
+            chunk = client_ids[start:start + BULK_CHUNK_SIZE]
+            rows = db.query(ClientBalance.clientId, ClientBalance.balance).filter(ClientBalance.clientId.in_(chunk))
+            for client_id, balance in rows:
+                balances[str(client_id)] = balance
+        return {"balances": [{"user_id": client_id, "balance": balance} for client_id, balance in balances.items()]}
+
+    return await session.run(work)
+
+@app.get("/balance/leaderboard")
+async def get_leaderboard(limit: int = 10, offset: int = 0, session=Depends(get_db)):
+    limit = max(1, min(limit, LEADERBOARD_MAX_LIMIT))
+    offset = max(0, offset)
+    cached = leaderboard_cache.get((limit, offset))
+    if cached is not None:
+        return cached
+    logger.info(f"Computing leaderboard page (limit: {limit}, offset: {offset})")
+    version = leaderboard_cache.version
+
+    def work(db: Session):
+        rank = func.rank().over(order_by=ClientBalance.balance.desc()).label("rank")
+        rows = (
+            db.query(ClientBalance.clientId, ClientBalance.balance, rank)
+            .order_by(ClientBalance.balance.desc(), ClientBalance.clientId)
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
+        total = db.query(func.count(ClientBalance.clientId)).scalar()
+        return {
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "entries": [{"rank": r.rank, "user_id": str(r.clientId), "balance": r.balance} for r in rows]
+        }
+
+    page = await session.run(work)
+    leaderboard_cache.set((limit, offset), page, version)
+    return page
+
+@app.get("/balance/leaderboard/rank/{user_id}")
+async def get_leaderboard_rank(user_id: str, session=Depends(get_db)):
+    logger.info(f"Getting leaderboard rank for user: {user_id}")
+
+    def work(db: Session):
+        row = db.get(ClientBalance, user_id)
+        balance = row.balance if row else 0
+        # Same semantics as RANK(): ties share a rank, one more than everybody strictly richer
+        richer = db.query(func.count(ClientBalance.clientId)).filter(ClientBalance.balance > balance).scalar()
+        total = db.query(func.count(ClientBalance.clientId)).scalar()
+        return {"user_id": user_id, "balance": balance, "rank": richer + 1, "total": total}
+
+    return await session.run(work)
+
+@app.get("/balance/changes")
+async def get_balance_changes(since: int = 0, limit: int = 100, session=Depends(get_db)):
+    """Operations with seq > since, in seq order; pass the returned nextSince back to continue."""
+    limit = max(1, min(limit, CHANGES_MAX_LIMIT))
+    logger.info(f"Getting balance changes since {since} (limit: {limit})")
+
+    def work(db: Session):
+        # Number whatever has finished since the last run so the reader is not a tick behind
+        sequence_operations(db)
+        selects = [
+            select(model.seq, model.id, model.clientId, model.amount, model.description, model.createdAt, model.transactionId)
+            .where(model.seq > since)
+            for model in (BalanceOperation, BalanceOperationArchive)
+        ]
+        feed = union_all(*selects).subquery()
+        rows = db.execute(select(feed).order_by(feed.c.seq).limit(limit + 1)).mappings().all()
+        return [dict(row) for row in rows]
+
+    rows = await session.run(work)
+    changes = rows[:limit]
+    return {
+        "changes": changes,
+        "nextSince": changes[-1]["seq"] if changes else since,
+        "hasMore": len(rows) > limit
+    }
+
+@app.get("/balance/export")
+async def export_balance_operations(client_id: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None, include_archived: bool = True):
+    """Stream operations as NDJSON, one per line, ordered by (createdAt, id).
+
+    Rows come off a server-side cursor EXPORT_BATCH_SIZE at a time, so memory use does not grow
+    with the size of the export. Filter by client and/or [start, end); no filters exports everything.
+    """
+    # Validated before streaming starts, since an error inside the stream cannot change the status code
+    if client_id:
+        client_id = canonical_client_id(client_id)
+    logger.info(f"Exporting operations (client: {client_id}, start: {start}, end: {end})")
+    models = [BalanceOperation, BalanceOperationArchive] if include_archived else [BalanceOperation]
+    selects = []
+    for model in models:
+        conditions = []
+        if client_id:
+            conditions.append(model.clientId == client_id)
+        if start:
+            conditions.append(model.createdAt >= start)
+        if end:
+            conditions.append(model.createdAt < end)
+        selects.append(select(
+            model.seq, model.id, model.clientId, model.amount, model.description, model.createdAt, model.updatedAt,
+            model.transactionId
+        ).where(*conditions))
+    ledger = union_all(*selects).subquery() if len(selects) > 1 else selects[0].subquery()
+    statement = select(ledger).order_by(ledger.c.createdAt, ledger.c.id)
+
+    async def lines():
+        exported = 0
+        async for rows in database.stream(statement, EXPORT_BATCH_SIZE):
+            exported += len(rows)
+            yield "".join(ndjson_line(row) for row in rows)
+        logger.info(f"Exported {exported} operations")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/balance/{user_id}", response_model=UserBalanceResponse)
+async def get_user_balance(user_id: str, session=Depends(get_db)):
+    logger.info(f"Getting balance for user: {user_id}")
+
+    def work(db: Session):
+        row = db.get(ClientBalance, user_id)
+        return row.balance if row else 0
+
+    balance = await session.run(work)
+    logger.info(f"User {user_id} balance: {balance}")
+    return {"user_id": user_id, "balance": balance}
+
+@app.get("/balance/operations/{user_id}", response_model=Union[List[BalanceOperationResponse], BalanceOperationPage])
+async def get_user_operations(user_id: str, include_archived: bool = True, limit: Optional[int] = None, cursor: Optional[str] = None, session=Depends(get_db)):
     logger.info(f"Getting operations for user: {user_id}")
-    db: Session = SessionLocal()
-    try:
-        ops = db.query(BalanceOperation).filter(BalanceOperation.clientId == user_id).all()
-        logger.info(f"Retrieved {len(ops)} operations for user {user_id}")
-        return ops
-    finally:
-        db.close()
+
+    def work(db: Session):
+        if limit is None and cursor is None:
+            models = [BalanceOperation, BalanceOperationArchive] if include_archived else [BalanceOperation]
+            # Column tuples rather than ORM entities: no identity map or instance state per row
+            ops = []
+            for model in models:
+                ops += [dict(row) for row in db.execute(ledger_select(model, model.clientId == user_id)).mappings()]
+            logger.info(f"Retrieved {len(ops)} operations for user {user_id}")
+            return ops
+
+        # Keyset page, newest first, ordered by (createdAt, id)
+        page_size = max(1, min(limit or 50, OPERATIONS_MAX_LIMIT))
+        models = [BalanceOperation, BalanceOperationArchive] if include_archived else [BalanceOperation]
+        selects = []
+        for model in models:
+            conditions = [model.clientId == user_id]
+            if cursor:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+                # The plain createdAt bound is implied by the tuple one but lets the planner prune newer partitions
+                conditions.append(model.createdAt <= cursor_created_at)
+                # Typed as the uuid column, or asyncpg sends the id as varchar and uuid < varchar has no operator
+                conditions.append(tuple_(model.createdAt, model.id) < tuple_(cursor_created_at, literal(cursor_id, model.id.type)))
+            selects.append(ledger_select(model, *conditions))
+        ledger = union_all(*selects).subquery() if len(selects) > 1 else selects[0].subquery()
+        rows = db.execute(
+            select(ledger).order_by(ledger.c.createdAt.desc(), ledger.c.id.desc()).limit(page_size + 1)
+        ).mappings().all()
+        items = [dict(row) for row in rows[:page_size]]
+        next_cursor = encode_cursor(items[-1]["createdAt"], items[-1]["id"]) if len(rows) > page_size else None
+        logger.info(f"Retrieved {len(items)} operations for user {user_id}")
+        return {"items": items, "nextCursor": next_cursor}
+
+    return await session.run(work)
+
+@app.get("/balance/operations/{user_id}/summary")
+async def get_user_operations_summary(user_id: str, session=Depends(get_db)):
+    logger.info(f"Getting operations summary for user: {user_id}")
+
+    def work(db: Session):
+        hot = select(
+            func.coalesce(func.sum(BalanceOperation.amount).filter(BalanceOperation.amount > 0), 0).label("totalIncome"),
+            func.coalesce(-func.sum(BalanceOperation.amount).filter(BalanceOperation.amount < 0), 0).label("totalExpense"),
+            func.count(BalanceOperation.id).label("operationCount")
+        ).where(BalanceOperation.clientId == user_id).subquery("hot")
+        checkpoint = select(
+            BalanceCheckpoint.totalIncome, BalanceCheckpoint.totalExpense, BalanceCheckpoint.operationCount
+        ).where(BalanceCheckpoint.clientId == user_id).subquery("checkpoint")
+        # One statement reads both under one snapshot, so a compaction committing in between cannot
+        # leave operations counted in both halves or in neither
+        totals = db.execute(
+            select(*[
+                (hot.c[column] + func.coalesce(checkpoint.c[column], 0)).label(column)
+                for column in ("totalIncome", "totalExpense", "operationCount")
+            ]).select_from(hot.outerjoin(checkpoint, true()))
+        ).mappings().one()
+        return {"user_id": user_id, **totals}
+
+    return await session.run(work)
+
+@app.get("/balance/stats/{user_id}")
+async def get_user_stats(user_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None, session=Depends(get_db)):
+    """Income/expense totals, counts and daily/weekly net buckets, all aggregated in Postgres.
+
+    Covers hot and archived operations, optionally limited to [start, end).
+    """
+    logger.info(f"Getting stats for user: {user_id} (start: {start}, end: {end})")
+
+    def work(db: Session):
+        selects = []
+        for model in (BalanceOperation, BalanceOperationArchive):
+            conditions = [model.clientId == user_id]
+            if start:
+                conditions.append(model.createdAt >= start)
+            if end:
+                conditions.append(model.createdAt < end)
+            selects.append(select(model.amount, model.createdAt).where(*conditions))
+        ledger = union_all(*selects).cte("ledger")
+        income = func.coalesce(func.sum(ledger.c.amount).filter(ledger.c.amount > 0), 0)
+        expense = func.coalesce(-func.sum(ledger.c.amount).filter(ledger.c.amount < 0), 0)
+
+        totals = db.execute(select(
+            income.label("totalIncome"),
+            expense.label("totalExpense"),
+            func.count().filter(ledger.c.amount > 0).label("incomeCount"),
+            func.count().filter(ledger.c.amount < 0).label("expenseCount"),
+            func.count().label("operationCount")
+        )).mappings().one()
+
+        def buckets(unit: str):
+            bucket = func.date_trunc(unit, ledger.c.createdAt).label("bucket")
+            rows = db.execute(
+                select(
+                    bucket,
+                    income.label("income"),
+                    expense.label("expense"),
+                    func.sum(ledger.c.amount).label("net"),
+                    func.count().label("count")
+                ).group_by(bucket).order_by(bucket)
+            ).mappings().all()
+            return [dict(row) for row in rows]
+
+        return {"user_id": user_id, **totals, "daily": buckets("day"), "weekly": buckets("week")}
+
+    return await session.run(work)
+
+@app.get("/balance/history/{user_id}")
+async def get_user_balance_history(user_id: str, days: int = 30, session=Depends(get_db)):
+    """Closing balance for each of the last `days` days (oldest first), cached until the client's next write."""
+    # Writes invalidate the canonical id's entry, so every spelling must share it
+    user_id = canonical_client_id(user_id)
+    days = max(1, min(days, HISTORY_MAX_DAYS))
+    today = datetime.utcnow().date()
+    cache_key = (user_id, today)
+    series = history_cache.get(cache_key)
+    if series is None:
+        logger.info(f"Computing balance history for user: {user_id}")
+        version = history_cache.version
+
+        def work(db: Session):
+            # Always HISTORY_MAX_DAYS so one cached series answers every `days`
+            rows = db.execute(
+                text(BALANCE_HISTORY_SQL), {"client_id": user_id, "today": today, "days": HISTORY_MAX_DAYS}
+            ).mappings().all()
+            return [{"day": row["day"].isoformat(), "net": row["net"], "balance": row["balance"]} for row in rows]
+
+        series = await session.run(work)
+        history_cache.set(cache_key, series, version)
+    return {"user_id": user_id, "days": days, "series": series[-days:]}
+
+@app.post("/balance/maintenance/rebuild")
+async def rebuild_client_balances(session=Depends(get_db)):
+    logger.info("Rebuilding client_balance from balance_operation")
+
+    def work(db: Session):
+        # Blocks concurrent operation inserts and compaction (but not reads) until the rebuild commits
+        db.execute(text('LOCK TABLE balance_operation IN SHARE MODE'))
+        db.execute(text('DELETE FROM client_balance'))
+        result = db.execute(text(
+            'INSERT INTO client_balance ("clientId", "balance", "updatedAt") '
+            f'SELECT "clientId", "total", now() FROM ({LEDGER_TOTALS_SQL}) totals'
+        ))
+        db.commit()
+        return result.rowcount
+
+    rebuilt = await session.run(work)
+    on_balances_changed(None)
+    logger.info(f"Rebuilt balances for {rebuilt} clients")
+    return {"rebuiltClients": rebuilt}
+
+@app.get("/balance/maintenance/consistency")
+async def check_client_balances(limit: int = 100, session=Depends(get_db)):
+    logger.info("Checking client_balance against balance_operation")
+
+    def work(db: Session):
+        return db.execute(text(
+            'SELECT COALESCE(b."clientId", o."clientId") AS "clientId", '
+            'COALESCE(b."balance", 0) AS "materialized", COALESCE(o."total", 0) AS "ledger" '
+            f'FROM client_balance b FULL OUTER JOIN ({LEDGER_TOTALS_SQL}) o '
+            'ON o."clientId" = b."clientId" '
+            'WHERE COALESCE(b."balance", 0) <> COALESCE(o."total", 0) '
+            'LIMIT :limit'
+        ), {"limit": limit}).mappings().all()
+
+    rows = await session.run(work)
+    mismatches = [{"clientId": str(r["clientId"]), "materialized": r["materialized"], "ledger": r["ledger"]} for r in rows]
+    if mismatches:
+        logger.warning(f"Found {len(mismatches)} client balance mismatches")
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+@app.post("/balance/maintenance/compact")
+async def compact_balance_ledger(retention_days: int = COMPACTION_RETENTION_DAYS, session=Depends(get_db)):
+    logger.info(f"Compacting operations older than {retention_days} days")
+    compacted = await session.run(compact_ledger, retention_days)
+    logger.info(f"Compacted {compacted['operations']} operations in {compacted['batches']} batches")
+    return compacted
+
+@app.post("/balance/maintenance/partitions")
+async def maintain_balance_partitions(retention_days: int = COMPACTION_RETENTION_DAYS, session=Depends(get_db)):
+    logger.info(f"Maintaining balance_operation partitions (retention: {retention_days} days)")
+    result = await session.run(maintain_partitions, retention_days)
+    logger.info(f"Created partitions {result['created']}, archived {result['archived']}, skipped {result['skipped']}")
+    return result
+
+@app.get("/balance/reconciliation/report")
+async def get_reconciliation_report(check: Optional[str] = None, limit: int = 100, session=Depends(get_db)):
+    if check is not None and check not in CHECKS:
+        raise HTTPException(status_code=400, detail=f"Unknown check, expected one of {', '.join(CHECKS)}")
+    limit = max(1, min(limit, RECONCILIATION_REPORT_MAX_LIMIT))
+    return await session.run(reconciliation_report, check, limit)
+
+@app.post("/balance/reconciliation/run")
+async def run_ledger_reconciliation(chunk_size: int = RECONCILIATION_CHUNK_SIZE, session=Depends(get_db)):
+    logger.info(f"Running ledger reconciliation (chunk size: {chunk_size})")
+    results = await session.run(run_reconciliation, chunk_size, RECONCILIATION_SETTLE_SECONDS)
+    logger.info(f"Reconciliation results: {results}")
+    return results
+
+@app.post("/balance/accrual")
+async def create_accrual_run(accrual: AccrualRunCreate, session=Depends(get_db)):
+    """Apply interest or tax to every balance above threshold; rerun with the same runId to resume."""
+    if not 0 < accrual.rateBps <= 10000:
+        raise HTTPException(status_code=400, detail="rateBps must be between 1 and 10000")
+    if accrual.threshold < 0:
+        raise HTTPException(status_code=400, detail="threshold cannot be negative")
+    description = accrual.description or DEFAULT_DESCRIPTIONS[accrual.kind]
+    logger.info(f"Accrual run {accrual.runId}: {accrual.kind} at {accrual.rateBps} bps above {accrual.threshold} "
+                f"(dry run: {accrual.dryRun})")
+
+    def work(db: Session):
+        if accrual.dryRun:
+            run = db.get(AccrualRun, accrual.runId)
+            if run is not None and run.status == COMPLETED:
+                return {"runId": accrual.runId, "dryRun": True, "clients": 0, "totalAmount": 0, "resumeAfter": None}
+            after = run.lastClientId if run is not None else None
+            preview = preview_accrual(db, accrual.kind, accrual.rateBps, accrual.threshold, after)
+            return {"runId": accrual.runId, "dryRun": True, **preview, "resumeAfter": after}
+
+        run = start_accrual_run(db, accrual.runId, accrual.kind, accrual.rateBps, accrual.threshold, description)
+        if (run.kind, run.rateBps, run.threshold) != (accrual.kind, accrual.rateBps, accrual.threshold):
+            raise HTTPException(status_code=422, detail="runId was already used with different parameters")
+        return run_accrual(db, accrual.runId, ACCRUAL_CHUNK_SIZE)
+
+    result = await session.run(work)
+    if not accrual.dryRun and result["operations"]:
+        on_balances_changed(None)
+    return result
+
+@app.get("/balance/accrual/{run_id}")
+async def get_accrual_run(run_id: str, session=Depends(get_db)):
+    def work(db: Session):
+        run = db.get(AccrualRun, run_id)
+        return accrual_summary(run) if run else None
+
+    result = await session.run(work)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Accrual run not found")
+    return result
 
 @app.get("/health")
 def health_check():
@@ -0,0 +1,75 @@
+"""Burst-write benchmark for group commit.
+
+Start two instances against the same database, one with group commit and one without:
+
+    GROUP_COMMIT_ENABLED=false uvicorn api_service:app --port 5011
+    GROUP_COMMIT_ENABLED=true  uvicorn api_service:app --port 5012
+
+then run (needs aiohttp):
+
+    python benchmarks/group_commit.py --plain-url http://localhost:5011 --grouped-url http://localhost:5012
+
+Each run fires --requests /balance/add calls with --concurrency in flight at once, the shape of
+the midnight daily-coins burst, and reports committed writes per second and latency percentiles.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import aiohttp
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def burst(base_url, total, concurrency):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def add(session, client_id):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            async with session.post(f"{base_url}/balance/add", json={
+                "clientId": client_id, "amount": 1000, "description": "Daily coins claim"
+            }) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*[add(session, str(uuid.uuid4())) for _ in range(total)])
+        elapsed = time.perf_counter() - started
+    return {
+        "writes_per_s": (total - errors) / elapsed,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plain-url", default="http://localhost:5011")
+    parser.add_argument("--grouped-url", default="http://localhost:5012")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.requests} writes, {args.concurrency} in flight")
+    print(f"{'mode':<8} {'writes/s':>10} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, base_url in (("plain", args.plain_url), ("grouped", args.grouped_url)):
+        result = await burst(base_url.rstrip("/"), args.requests, args.concurrency)
+        print(f"{mode:<8} {result['writes_per_s']:>10.1f} {result['errors']:>7} "
+              f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Load test comparing balance_api in DB_MODE=sync and DB_MODE=async.
+
+Start two instances of the service against the same database, one per mode:
+
+    DB_MODE=sync  uvicorn api_service:app --port 5011
+    DB_MODE=async uvicorn api_service:app --port 5012
+
+then run (needs aiohttp):
+
+    python benchmarks/load_benchmark.py --sync-url http://localhost:5011 --async-url http://localhost:5012
+
+Each run keeps --concurrency clients busy for --duration seconds. Every client loops over a
+mix of balance reads and /balance/add writes and records the latency of each request.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+import aiohttp
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def client_loop(session, base_url, client_ids, write_ratio, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        client_id = random.choice(client_ids)
+        started = time.perf_counter()
+        try:
+            if random.random() < write_ratio:
+                request = session.post(f"{base_url}/balance/add", json={
+                    "clientId": client_id, "amount": 1, "description": "load test"
+                })
+            else:
+                request = session.get(f"{base_url}/balance/{client_id}")
+            async with request as response:
+                await response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+        except aiohttp.ClientError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(base_url, concurrency, duration, client_ids, write_ratio):
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            client_loop(session, base_url, client_ids, write_ratio, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", default="http://localhost:5011")
+    parser.add_argument("--async-url", default="http://localhost:5012")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--clients", type=int, default=1000, help="distinct client ids to spread load over")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="fraction of requests that are /balance/add")
+    args = parser.parse_args()
+
+    client_ids = [str(uuid.uuid4()) for _ in range(args.clients)]
+    print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per mode, {args.write_ratio:.0%} writes")
+    print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, base_url in (("sync", args.sync_url), ("async", args.async_url)):
+        result = await run(base_url.rstrip("/"), args.concurrency, args.duration, client_ids, args.write_ratio)
+        print(f"{mode:<6} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Microbenchmark: serializing 10k operations the old way versus the new way.
+
+Run from the balance_api directory (needs the service requirements, no database):
+
+    python benchmarks/serialization.py [--operations 10000] [--repeat 5]
+
+before: ORM BalanceOperation instances through jsonable_encoder and the stdlib JSONResponse,
+        which is what FastAPI did with the entities the endpoints used to return.
+after:  column-tuple rows validated against the response model and rendered by ORJSONResponse,
+        which is the path the endpoints take now.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from models.BalanceOperation import BalanceOperation
+from models.BalanceOperationResponse import BalanceOperationResponse
+
+
+def make_rows(count):
+    client_id = str(uuid.uuid4())
+    started = datetime(2025, 1, 1)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "clientId": client_id,
+            "amount": (i % 200) - 100,
+            "description": f"Operation {i}",
+            "createdAt": started + timedelta(minutes=i),
+            "updatedAt": started + timedelta(minutes=i),
+            "seq": i + 1,
+        }
+        for i in range(count)
+    ]
+
+
+def make_entities(rows):
+    entities = []
+    for row in rows:
+        op = BalanceOperation(clientId=row["clientId"], amount=row["amount"], description=row["description"])
+        op.id, op.createdAt, op.updatedAt, op.seq = row["id"], row["createdAt"], row["updatedAt"], row["seq"]
+        entities.append(op)
+    return entities
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.operations)
+    entities = make_entities(rows)
+    adapter = TypeAdapter(List[BalanceOperationResponse])
+
+    def before():
+        return JSONResponse(jsonable_encoder(entities)).body
+
+    def after():
+        return ORJSONResponse(adapter.dump_python(adapter.validate_python(rows), mode="json")).body
+
+    print(f"{args.operations} operations, best of {args.repeat}")
+    baseline = None
+    for name, fn in (("before", before), ("after", after)):
+        elapsed, size = best_of(args.repeat, fn)
+        baseline = baseline or elapsed
+        print(f"{name:<7} {elapsed * 1000:>9.1f} ms {size / 1024:>9.0f} KiB {baseline / elapsed:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
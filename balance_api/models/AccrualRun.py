@@ -0,0 +1,25 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+
+Base = declarative_base()
+
+class AccrualRun(Base):
+    """An interest or tax run; lastClientId is the resume point, operations carry reference accrual:<id>."""
+    __tablename__ = "accrual_run"
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    rateBps = Column(Integer, nullable=False)
+    threshold = Column(Integer, nullable=False)
+    description = Column(String, nullable=False)
+    status = Column(String, default="running", nullable=False)
+    lastClientId = Column(UUID(as_uuid=False), nullable=True)
+    operations = Column(Integer, default=0, nullable=False)
+    totalAmount = Column(BigInteger, default=0, nullable=False)
+    createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completedAt = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return (f"AccrualRun(id={self.id}, kind={self.kind}, rateBps={self.rateBps}, "
+                f"status={self.status}, operations={self.operations})")
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+class AccrualRunCreate(BaseModel):
+    runId: str
+    kind: Literal["interest", "tax"]
+    # Basis points of the part of each balance above threshold: 100 = 1%
+    rateBps: int
+    threshold: int = 0
+    description: Optional[str] = None
+    dryRun: bool = False
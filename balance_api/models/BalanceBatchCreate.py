@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+class BalanceBatchItem(BaseModel):
+    clientId: str
+    amount: int
+    description: str
+    type: Literal["add", "subtract"] = "add"
+    reference: Optional[str] = None
+
+class BalanceBatchCreate(BaseModel):
+    operations: List[BalanceBatchItem]
@@ -0,0 +1,21 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+
+Base = declarative_base()
+
+class BalanceCheckpoint(Base):
+    """Running totals of every operation a client has had moved to the archive."""
+    __tablename__ = "balance_checkpoint"
+    clientId = Column(UUID(as_uuid=False), primary_key=True)
+    balance = Column(BigInteger, default=0, nullable=False)
+    totalIncome = Column(BigInteger, default=0, nullable=False)
+    totalExpense = Column(BigInteger, default=0, nullable=False)
+    operationCount = Column(Integer, default=0, nullable=False)
+    cutoff = Column(DateTime, nullable=False)
+    updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return (f"BalanceCheckpoint(clientId={self.clientId}, balance={self.balance}, "
+                f"operationCount={self.operationCount}, cutoff={self.cutoff})")
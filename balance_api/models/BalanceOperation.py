@@ -1,5 +1,6 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, text
+from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
 
@@ -7,17 +8,26 @@ Base = declarative_base()
 
 class BalanceOperation(Base):
     __tablename__ = "balance_operation"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    clientId = Column(String, nullable=False)
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
+    clientId = Column(UUID(as_uuid=False), nullable=False)
     amount = Column(Integer, nullable=False)
     description = Column(String, nullable=False)
     createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
     updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Change-feed position; NULL until the sequencer numbers the row after its transaction finishes
+    seq = Column(BigInteger, nullable=True)
+    txid = Column(BigInteger, server_default=text("pg_current_xact_id()::text::bigint"), nullable=False)
+    # What the operation belongs to (e.g. "bet:42:payout"), for reconciliation
+    reference = Column(String, nullable=True)
+    # The balance_transaction this operation is a leg of, for transfers
+    transactionId = Column(UUID(as_uuid=False), nullable=True)
 
-    def __init__(self, clientId: str, amount: int, description: str):
+    def __init__(self, clientId: str, amount: int, description: str, reference: str = None, transactionId: str = None):
         self.clientId = clientId
         self.amount = amount
         self.description = description
+        self.reference = reference
+        self.transactionId = transactionId
 
     def __repr__(self):
         return (f"BalanceOperation(id={self.id}, clientId={self.clientId}, "
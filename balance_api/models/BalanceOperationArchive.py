@@ -0,0 +1,24 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+
+Base = declarative_base()
+
+class BalanceOperationArchive(Base):
+    """Compacted balance operations; same columns as balance_operation."""
+    __tablename__ = "balance_operation_archive"
+    id = Column(UUID(as_uuid=False), primary_key=True)
+    clientId = Column(UUID(as_uuid=False), nullable=False)
+    amount = Column(Integer, nullable=False)
+    description = Column(String, nullable=False)
+    createdAt = Column(DateTime, nullable=False)
+    updatedAt = Column(DateTime, nullable=False)
+    seq = Column(BigInteger, nullable=True)
+    txid = Column(BigInteger, nullable=False)
+    reference = Column(String, nullable=True)
+    transactionId = Column(UUID(as_uuid=False), nullable=True)
+
+    def __repr__(self):
+        return (f"BalanceOperationArchive(id={self.id}, clientId={self.clientId}, "
+                f"amount={self.amount}, description={self.description}, "
+                f"createdAt={self.createdAt})")
@@ -1,6 +1,8 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class BalanceOperationCreate(BaseModel):
     clientId: str 
     amount: int
     description: str
+    reference: Optional[str] = None
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class BalanceOperationResponse(BaseModel):
+    id: str
+    clientId: str
+    amount: int
+    description: str
+    createdAt: datetime
+    updatedAt: datetime
+    seq: Optional[int] = None
+    transactionId: Optional[str] = None
+
+class BalanceOperationPage(BaseModel):
+    items: List[BalanceOperationResponse]
+    nextCursor: Optional[str] = None
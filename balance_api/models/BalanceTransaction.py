@@ -0,0 +1,20 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from datetime import datetime
+
+Base = declarative_base()
+
+class BalanceTransaction(Base):
+    """A transfer between clients; its legs are the operations whose transactionId is this id."""
+    __tablename__ = "balance_transaction"
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
+    senderId = Column(UUID(as_uuid=False), nullable=False)
+    amount = Column(Integer, nullable=False)
+    description = Column(String, nullable=False)
+    createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return (f"BalanceTransaction(id={self.id}, senderId={self.senderId}, "
+                f"amount={self.amount}, description={self.description})")
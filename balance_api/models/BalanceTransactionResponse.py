@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+from models.BalanceOperationResponse import BalanceOperationResponse
+
+class BalanceTransactionResponse(BaseModel):
+    id: str
+    senderId: str
+    amount: int
+    description: str
+    createdAt: datetime
+    legs: List[BalanceOperationResponse]
@@ -0,0 +1,16 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+
+Base = declarative_base()
+
+class ClientBalance(Base):
+    __tablename__ = "client_balance"
+    clientId = Column(UUID(as_uuid=False), primary_key=True)
+    balance = Column(BigInteger, default=0, nullable=False)
+    updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return (f"ClientBalance(clientId={self.clientId}, balance={self.balance}, "
+                f"updatedAt={self.updatedAt})")
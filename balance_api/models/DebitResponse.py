@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from models.BalanceOperationResponse import BalanceOperationResponse
+
+class DebitResponse(BaseModel):
+    operation: BalanceOperationResponse
+    balance: int
@@ -0,0 +1,20 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+Base = declarative_base()
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+    key = Column(String, primary_key=True)
+    endpoint = Column(String, nullable=False)
+    requestHash = Column(String, nullable=False)
+    statusCode = Column(Integer, nullable=True)
+    response = Column(JSONB, nullable=True)
+    createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expiresAt = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (f"IdempotencyKey(key={self.key}, endpoint={self.endpoint}, "
+                f"statusCode={self.statusCode}, expiresAt={self.expiresAt})")
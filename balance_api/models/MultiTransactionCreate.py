@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import List
+
+class TransferRecipient(BaseModel):
+    receiverId: str
+    amount: int
+
+class MultiTransactionCreate(BaseModel):
+    senderId: str
+    receivers: List[TransferRecipient]
+    description: str
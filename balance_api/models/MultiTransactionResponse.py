@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List
+from models.BalanceOperationResponse import BalanceOperationResponse
+
+class MultiTransactionResponse(BaseModel):
+    transactionId: str
+    sender: BalanceOperationResponse
+    receivers: List[BalanceOperationResponse]
+    senderBalance: int
@@ -0,0 +1,16 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+Base = declarative_base()
+
+class ReconciliationCheckpoint(Base):
+    """How far each reconciliation check has got through its source table."""
+    __tablename__ = "reconciliation_checkpoint"
+    check = Column(String, primary_key=True)
+    position = Column(JSONB, nullable=False)
+    updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"ReconciliationCheckpoint(check={self.check}, position={self.position})"
@@ -0,0 +1,18 @@
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+Base = declarative_base()
+
+class ReconciliationIssue(Base):
+    """An invariant violation found by a reconciliation check; one row per (check, subject)."""
+    __tablename__ = "reconciliation_issue"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    check = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    detail = Column(JSONB, nullable=False)
+    detectedAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"ReconciliationIssue(check={self.check}, subject={self.subject}, detail={self.detail})"
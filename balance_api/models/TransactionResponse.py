@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+from models.BalanceOperationResponse import BalanceOperationResponse
+
+class TransactionResponse(BaseModel):
+    # Absent from responses stored for idempotent replay before transfers had a transaction record
+    transactionId: Optional[str] = None
+    sender: BalanceOperationResponse
+    receiver: BalanceOperationResponse
+    senderBalance: int
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import List
+
+class UserBalanceResponse(BaseModel):
+    user_id: str
+    balance: int
+
+class BulkBalanceResponse(BaseModel):
+    balances: List[UserBalanceResponse]
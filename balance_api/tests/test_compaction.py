@@ -0,0 +1,114 @@
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import text
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from conftest import ensure_partition
+from api_service import compact_ledger_batch, archive_partition
+
+# Far enough back that nothing but the rows written here is older than the cutoff
+CREATED_AT = datetime(2000, 1, 1, 12)
+CUTOFF = datetime(2000, 1, 2)
+
+
+def insert_sequenced(db, client_id: str, amounts, created_at: datetime = CREATED_AT):
+    ensure_partition(db, created_at)
+    db.execute(text(
+        'INSERT INTO balance_operation ("clientId", "amount", "description", "createdAt", "seq") '
+        'VALUES (CAST(:client_id AS uuid), :amount, \'test\', :created_at, nextval(\'balance_operation_seq\'))'
+    ), [{"client_id": client_id, "amount": amount, "created_at": created_at} for amount in amounts])
+    db.commit()
+
+
+def ledger_state(db, client_id: str) -> dict:
+    params = {"client_id": client_id}
+    return {
+        "hot": db.execute(text(
+            'SELECT COUNT(*) FROM balance_operation WHERE "clientId" = CAST(:client_id AS uuid)'
+        ), params).scalar(),
+        "archived": db.execute(text(
+            'SELECT COUNT(*) FROM balance_operation_archive WHERE "clientId" = CAST(:client_id AS uuid)'
+        ), params).scalar(),
+        "checkpoint": dict(db.execute(text(
+            'SELECT "balance", "totalIncome", "totalExpense", "operationCount" FROM balance_checkpoint '
+            'WHERE "clientId" = CAST(:client_id AS uuid)'
+        ), params).mappings().one())
+    }
+
+
+def test_compact_ledger_batch_archives_and_checkpoints(run_db, new_client):
+    first, second = new_client(), new_client()
+    run_db(insert_sequenced, first, [100, -30, 5])
+    run_db(insert_sequenced, second, [-7])
+
+    result = run_db(compact_ledger_batch, CUTOFF, 1000)
+
+    assert result["operations"] >= 4
+    assert result["clients"] >= 2
+    assert run_db(ledger_state, first) == {
+        "hot": 0,
+        "archived": 3,
+        "checkpoint": {"balance": 75, "totalIncome": 105, "totalExpense": 30, "operationCount": 3}
+    }
+    assert run_db(ledger_state, second) == {
+        "hot": 0,
+        "archived": 1,
+        "checkpoint": {"balance": -7, "totalIncome": 0, "totalExpense": 7, "operationCount": 1}
+    }
+
+
+def test_compact_ledger_batch_folds_into_existing_checkpoint(run_db, new_client):
+    client_id = new_client()
+    run_db(insert_sequenced, client_id, [40])
+    run_db(compact_ledger_batch, CUTOFF, 1000)
+    run_db(insert_sequenced, client_id, [-15, 20])
+
+    run_db(compact_ledger_batch, CUTOFF, 1000)
+
+    assert run_db(ledger_state, client_id)["checkpoint"] == {
+        "balance": 45, "totalIncome": 60, "totalExpense": 15, "operationCount": 3
+    }
+
+
+def test_compact_ledger_batch_leaves_unsequenced_rows(run_db, new_client):
+    client_id = new_client()
+
+    def insert_unsequenced(db):
+        ensure_partition(db, CREATED_AT)
+        db.execute(text(
+            'INSERT INTO balance_operation ("clientId", "amount", "description", "createdAt") '
+            'VALUES (CAST(:client_id AS uuid), 10, \'test\', :created_at)'
+        ), {"client_id": client_id, "created_at": CREATED_AT})
+        db.commit()
+
+    run_db(insert_unsequenced)
+    run_db(compact_ledger_batch, CUTOFF, 1000)
+
+    def hot_count(db):
+        return db.execute(text(
+            'SELECT COUNT(*) FROM balance_operation WHERE "clientId" = CAST(:client_id AS uuid)'
+        ), {"client_id": client_id}).scalar()
+
+    assert run_db(hot_count) == 1
+
+
+def test_archive_partition_detaches_archives_and_drops_month(run_db, new_client):
+    client_id = new_client()
+    # A month of its own, so the partition holds nothing but these rows
+    run_db(insert_sequenced, client_id, [60, -25], datetime(1999, 6, 15))
+
+    archived = run_db(archive_partition, "balance_operation_p199906")
+
+    def partition_exists(db):
+        return db.execute(text("SELECT to_regclass('balance_operation_p199906') IS NOT NULL")).scalar()
+
+    assert archived == 2
+    assert not run_db(partition_exists)
+    assert run_db(ledger_state, client_id) == {
+        "hot": 0,
+        "archived": 2,
+        "checkpoint": {"balance": 35, "totalIncome": 60, "totalExpense": 25, "operationCount": 2}
+    }
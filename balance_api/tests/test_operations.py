@@ -0,0 +1,104 @@
+import os
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from fastapi import HTTPException
+
+from conftest import ensure_partition
+from api_service import get_user_operations, get_user_operations_summary, get_user_balance_history, compact_ledger_batch
+
+
+def insert_operations(db, client_id: str, amounts, start: datetime):
+    ensure_partition(db, start)
+    db.execute(text(
+        'INSERT INTO balance_operation ("clientId", "amount", "description", "createdAt") '
+        'VALUES (CAST(:client_id AS uuid), :amount, \'test\', :created_at)'
+    ), [
+        {"client_id": client_id, "amount": amount, "created_at": start + timedelta(minutes=index)}
+        for index, amount in enumerate(amounts)
+    ])
+    db.commit()
+
+
+def test_operations_pages_follow_cursor(run_db, call_endpoint, new_client):
+    client_id = new_client()
+    run_db(insert_operations, client_id, [1, 2, 3, 4, 5], datetime.utcnow() - timedelta(hours=1))
+
+    amounts, cursor, pages = [], None, 0
+    while True:
+        page = call_endpoint(get_user_operations, client_id, limit=2, cursor=cursor)
+        amounts += [item["amount"] for item in page["items"]]
+        pages += 1
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert amounts == [5, 4, 3, 2, 1]
+
+
+def test_balance_history_carries_balance_over_quiet_days(run_db, call_endpoint, new_client):
+    client_id = new_client()
+    now = datetime.utcnow()
+    run_db(insert_operations, client_id, [50], now - timedelta(days=2))
+    run_db(insert_operations, client_id, [-20], now.replace(hour=0, minute=0, second=0, microsecond=0))
+
+    history = call_endpoint(get_user_balance_history, client_id, days=3)
+
+    today = now.date()
+    assert history["series"] == [
+        {"day": (today - timedelta(days=2)).isoformat(), "net": 50, "balance": 50},
+        {"day": (today - timedelta(days=1)).isoformat(), "net": 0, "balance": 50},
+        {"day": today.isoformat(), "net": -20, "balance": 30}
+    ]
+
+
+def test_balance_history_accepts_uppercase_user_id(run_db, call_endpoint, new_client):
+    client_id = new_client()
+    now = datetime.utcnow()
+    run_db(insert_operations, client_id, [50], now - timedelta(days=1))
+
+    history = call_endpoint(get_user_balance_history, client_id.upper(), days=2)
+
+    assert history["user_id"] == client_id
+    assert history["series"][-1]["balance"] == 50
+
+
+def test_balance_history_rejects_malformed_user_id(call_endpoint):
+    with pytest.raises(HTTPException) as error:
+        call_endpoint(get_user_balance_history, "not-a-uuid")
+
+    assert error.value.status_code == 400
+
+
+def test_operations_summary_adds_checkpoint_to_hot_operations(run_db, call_endpoint, new_client):
+    client_id = new_client()
+    run_db(insert_operations, client_id, [100, -30], datetime(2000, 1, 1))
+
+    def sequence_and_compact(db):
+        db.execute(text(
+            'UPDATE balance_operation SET "seq" = nextval(\'balance_operation_seq\') '
+            'WHERE "clientId" = CAST(:client_id AS uuid)'
+        ), {"client_id": client_id})
+        db.commit()
+        compact_ledger_batch(db, datetime(2000, 1, 2), 1000)
+
+    run_db(sequence_and_compact)
+    run_db(insert_operations, client_id, [20, -5], datetime.utcnow() - timedelta(hours=1))
+
+    assert call_endpoint(get_user_operations_summary, client_id) == {
+        "user_id": client_id, "totalIncome": 120, "totalExpense": 35, "operationCount": 4
+    }
+
+
+def test_operations_summary_without_checkpoint(run_db, call_endpoint, new_client):
+    client_id = new_client()
+    run_db(insert_operations, client_id, [7], datetime.utcnow() - timedelta(hours=1))
+
+    assert call_endpoint(get_user_operations_summary, client_id) == {
+        "user_id": client_id, "totalIncome": 7, "totalExpense": 0, "operationCount": 1
+    }
@@ -0,0 +1,94 @@
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import text
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from tools.reconciliation import check_bet_settlements, load_position, save_position, BET_SETTLEMENT
+
+# Events are dated in the past and the check is started just before them, so it reaches them in one chunk
+EVENT_AT = datetime(2001, 1, 1)
+START_POSITION = {"since": "2000-12-31T00:00:00", "updatedAt": "2000-12-31T00:00:00", "id": 0}
+
+
+@pytest.fixture
+def bet_events(run_db):
+    """bet_events(pool, bets) creates a finished event won by option 1; everything is removed afterwards."""
+    created = []
+
+    def saved_position(db):
+        return db.execute(text('SELECT "position" FROM reconciliation_checkpoint WHERE "check" = :check'), {"check": BET_SETTLEMENT}).scalar()
+
+    original = run_db(saved_position)
+
+    def create(db, pool: int, bets):
+        event_id = db.execute(text(
+            'INSERT INTO bet_event ("title", "option1", "option2", "isActive", "isFinished", "winningOption", '
+            '"totalBetAmount", "createdAt", "updatedAt") '
+            'VALUES (\'test\', \'yes\', \'no\', false, true, 1, :pool, :at, :at) RETURNING "id"'
+        ), {"pool": pool, "at": EVENT_AT}).scalar()
+        for user_id, option, amount in bets:
+            db.execute(text(
+                'INSERT INTO user_bet ("userId", "betEventId", "chosenOption", "amount") VALUES (:user_id, :event_id, :option, :amount)'
+            ), {"user_id": user_id, "event_id": event_id, "option": option, "amount": amount})
+        db.commit()
+        created.append(event_id)
+        return event_id
+
+    yield lambda pool, bets: run_db(create, pool, bets)
+
+    def cleanup(db):
+        subjects = [f"bet_event:{event_id}" for event_id in created]
+        db.execute(text('DELETE FROM reconciliation_issue WHERE "check" = :check AND "subject" = ANY(:subjects)'), {
+            "check": BET_SETTLEMENT, "subjects": subjects
+        })
+        db.execute(text('DELETE FROM user_bet WHERE "betEventId" = ANY(:ids)'), {"ids": created})
+        db.execute(text('DELETE FROM bet_event WHERE "id" = ANY(:ids)'), {"ids": created})
+        if original is None:
+            db.execute(text('DELETE FROM reconciliation_checkpoint WHERE "check" = :check'), {"check": BET_SETTLEMENT})
+        else:
+            save_position(db, BET_SETTLEMENT, original)
+        db.commit()
+
+    run_db(cleanup)
+
+
+def write_operation(db, client_id: str, amount: int, reference: str):
+    db.execute(text(
+        'INSERT INTO balance_operation ("clientId", "amount", "description", "reference") '
+        'VALUES (CAST(:client_id AS uuid), :amount, \'test\', :reference)'
+    ), {"client_id": client_id, "amount": amount, "reference": reference})
+    db.commit()
+
+
+def recorded_issue(db, event_id: int):
+    return db.execute(text(
+        'SELECT "detail" FROM reconciliation_issue WHERE "check" = :check AND "subject" = :subject'
+    ), {"check": BET_SETTLEMENT, "subject": f"bet_event:{event_id}"}).scalar()
+
+
+def start_check(db):
+    save_position(db, BET_SETTLEMENT, START_POSITION)
+    db.commit()
+
+
+def test_check_bet_settlements_matches_references(run_db, new_client, bet_events):
+    winner, loser = new_client(), new_client()
+    settled = bet_events(100, [(winner, 1, 60), (loser, 2, 40)])
+    run_db(write_operation, winner, -60, f"bet:{settled}:stake")
+    run_db(write_operation, loser, -40, f"bet:{settled}:stake")
+    run_db(write_operation, winner, 100, f"bet:{settled}:payout")
+    unpaid = bet_events(50, [(winner, 1, 50)])
+    run_db(write_operation, winner, -50, f"bet:{unpaid}:stake")
+    run_db(start_check)
+
+    result = run_db(check_bet_settlements, 10000, 0)
+
+    assert result["checked"] >= 2
+    assert run_db(recorded_issue, settled) is None
+    assert run_db(recorded_issue, unpaid) == {
+        "betEventId": unpaid, "problems": ["payouts add up to 0 for a pool of 50 and 1 winners"]
+    }
+    assert datetime.fromisoformat(run_db(load_position, BET_SETTLEMENT, {})["updatedAt"]) >= EVENT_AT
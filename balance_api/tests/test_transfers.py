@@ -0,0 +1,143 @@
+import os
+import pytest
+from sqlalchemy import text
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from fastapi import HTTPException
+from api_service import add_balance_operation, debit_balance_operation, create_transaction, create_multi_transaction, create_batch_operations
+from models.BalanceOperationCreate import BalanceOperationCreate
+from models.TransactionCreate import TransactionCreate
+from models.MultiTransactionCreate import MultiTransactionCreate, TransferRecipient
+from models.BalanceBatchCreate import BalanceBatchCreate, BalanceBatchItem
+
+
+def fund(db, client_id: str, balance: int):
+    db.execute(text(
+        'INSERT INTO client_balance ("clientId", "balance", "updatedAt") VALUES (CAST(:client_id AS uuid), :balance, now())'
+    ), {"client_id": client_id, "balance": balance})
+    db.commit()
+
+
+def balance_of(db, client_id: str) -> int:
+    return db.execute(text(
+        'SELECT "balance" FROM client_balance WHERE "clientId" = CAST(:client_id AS uuid)'
+    ), {"client_id": client_id}).scalar()
+
+
+def test_debit_accepts_uppercase_client_id(run_db, call_endpoint, new_client):
+    client_id = new_client()
+    run_db(fund, client_id, 100)
+
+    body = call_endpoint(
+        debit_balance_operation, BalanceOperationCreate(clientId=client_id.upper(), amount=30, description="test"),
+        idempotency_key=None
+    )
+
+    assert body["balance"] == 70
+    assert body["operation"]["clientId"] == client_id
+    assert run_db(balance_of, client_id) == 70
+
+
+def test_transaction_accepts_uppercase_and_unhyphenated_ids(run_db, call_endpoint, new_client):
+    sender, receiver = new_client(), new_client()
+    run_db(fund, sender, 100)
+
+    body = call_endpoint(
+        create_transaction,
+        TransactionCreate(senderId=sender.upper(), receiverId=receiver.replace("-", ""), amount=40, description="test"),
+        idempotency_key=None
+    )
+
+    assert body["senderBalance"] == 60
+    assert run_db(balance_of, sender) == 60
+    assert run_db(balance_of, receiver) == 40
+
+
+def test_transaction_to_self_in_another_case_is_rejected(call_endpoint, new_client):
+    client_id = new_client()
+
+    with pytest.raises(HTTPException) as error:
+        call_endpoint(
+            create_transaction,
+            TransactionCreate(senderId=client_id, receiverId=client_id.upper(), amount=1, description="test"),
+            idempotency_key=None
+        )
+
+    assert error.value.status_code == 400
+
+
+def test_multi_transaction_accepts_uppercase_ids(run_db, call_endpoint, new_client):
+    sender, first, second = new_client(), new_client(), new_client()
+    run_db(fund, sender, 100)
+
+    body = call_endpoint(
+        create_multi_transaction,
+        MultiTransactionCreate(senderId=sender.upper(), receivers=[
+            TransferRecipient(receiverId=first.upper(), amount=25),
+            TransferRecipient(receiverId=second, amount=15)
+        ], description="test"),
+        idempotency_key=None
+    )
+
+    assert body["senderBalance"] == 60
+    assert [receiver["clientId"] for receiver in body["receivers"]] == [first, second]
+    assert run_db(balance_of, sender) == 60
+    assert run_db(balance_of, first) == 25
+    assert run_db(balance_of, second) == 15
+
+
+def test_multi_transaction_rejects_receiver_repeated_in_another_case(call_endpoint, new_client):
+    sender, receiver = new_client(), new_client()
+
+    with pytest.raises(HTTPException) as error:
+        call_endpoint(
+            create_multi_transaction,
+            MultiTransactionCreate(senderId=sender, receivers=[
+                TransferRecipient(receiverId=receiver, amount=1),
+                TransferRecipient(receiverId=receiver.upper(), amount=1)
+            ], description="test"),
+            idempotency_key=None
+        )
+
+    assert error.value.status_code == 400
+
+
+def test_batch_folds_spellings_of_one_client(run_db, call_endpoint, new_client):
+    client_id = new_client()
+    batch = BalanceBatchCreate(operations=[
+        BalanceBatchItem(clientId=client_id, amount=10, description="test"),
+        BalanceBatchItem(clientId=client_id.upper(), amount=5, description="test"),
+        BalanceBatchItem(clientId=client_id.replace("-", ""), amount=3, description="test", type="subtract")
+    ])
+
+    body = call_endpoint(create_batch_operations, batch, idempotency_key=None)
+
+    assert [op["amount"] for op in body["operations"]] == [10, 5, -3]
+    assert {op["clientId"] for op in body["operations"]} == {client_id}
+    assert [op.amount for op in batch.operations] == [10, 5, 3]
+    assert run_db(balance_of, client_id) == 12
+
+
+def test_batch_rejects_malformed_client_id(call_endpoint):
+    with pytest.raises(HTTPException) as error:
+        call_endpoint(
+            create_batch_operations,
+            BalanceBatchCreate(operations=[BalanceBatchItem(clientId="not-a-uuid", amount=1, description="test")]),
+            idempotency_key=None
+        )
+
+    assert error.value.status_code == 400
+
+
+def test_add_writes_canonical_client_id(run_db, call_endpoint, new_client):
+    client_id = new_client()
+
+    body = call_endpoint(
+        add_balance_operation, BalanceOperationCreate(clientId=client_id.upper(), amount=8, description="test"),
+        idempotency_key=None
+    )
+
+    assert body["clientId"] == client_id
+    assert run_db(balance_of, client_id) == 8
@@ -0,0 +1,118 @@
+"""Set-based interest and tax runs.
+
+A run moves every client balance above a threshold by rateBps basis points of the excess, credited
+for interest and debited for tax. Each chunk of clients is a single statement: the adjustments are
+computed from client_balance, written with one INSERT ... SELECT into balance_operation and folded
+back into client_balance, and the run's resume point is saved in the same transaction. A run that
+stops halfway carries on from its last committed chunk when it is started again with the same id.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models.AccrualRun import AccrualRun
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+COMPLETED = "completed"
+SIGNS = {"interest": 1, "tax": -1}
+DEFAULT_DESCRIPTIONS = {"interest": "Interest on balance", "tax": "Wealth tax"}
+ZERO_UUID = "00000000-0000-0000-0000-000000000000"
+
+# Integer division floors the adjustment; rateBps <= 10000 keeps a tax from taking more than the excess
+ADJUSTMENT_SQL = '(("balance" - :threshold)::bigint * :rate_bps / 10000)::integer'
+
+ACCRUAL_CHUNK_SQL = (
+    'WITH eligible AS ('
+    f'  SELECT "clientId", {ADJUSTMENT_SQL} AS "delta" FROM client_balance '
+    '  WHERE "clientId" > CAST(:after AS uuid) AND "balance" > :threshold '
+    # Locked in clientId order, like every other balance writer, so it cannot deadlock with them
+    '  ORDER BY "clientId" LIMIT :limit FOR UPDATE'
+    '), written AS ('
+    '  INSERT INTO balance_operation ("clientId", "amount", "description", "reference") '
+    '  SELECT "clientId", :sign * "delta", :description, :reference FROM eligible WHERE "delta" > 0 '
+    '  RETURNING "clientId", "amount"'
+    '), applied AS ('
+    '  UPDATE client_balance b SET "balance" = b."balance" + w."amount", "updatedAt" = now() '
+    '  FROM written w WHERE b."clientId" = w."clientId" RETURNING b."clientId"'
+    ') SELECT '
+    '(SELECT "clientId" FROM eligible ORDER BY "clientId" DESC LIMIT 1) AS "lastClientId", '
+    '(SELECT COUNT(*) FROM eligible) AS "scanned", '
+    '(SELECT COUNT(*) FROM applied) AS "operations", '
+    '(SELECT COALESCE(SUM("amount"), 0) FROM written) AS "totalAmount"'
+)
+
+ACCRUAL_PREVIEW_SQL = (
+    'SELECT COUNT(*) AS "clients", COALESCE(SUM("delta"), 0) AS "total" FROM ('
+    f'  SELECT {ADJUSTMENT_SQL} AS "delta" FROM client_balance '
+    '  WHERE "clientId" > CAST(:after AS uuid) AND "balance" > :threshold'
+    ') adjustments WHERE "delta" > 0'
+)
+
+
+def accrual_reference(run_id: str) -> str:
+    return f"accrual:{run_id}"
+
+
+def accrual_summary(run: AccrualRun) -> dict:
+    return {
+        "runId": run.id,
+        "kind": run.kind,
+        "rateBps": run.rateBps,
+        "threshold": run.threshold,
+        "description": run.description,
+        "status": run.status,
+        "operations": run.operations,
+        "totalAmount": run.totalAmount,
+        "lastClientId": run.lastClientId,
+        "createdAt": run.createdAt,
+        "completedAt": run.completedAt
+    }
+
+
+def start_accrual_run(db: Session, run_id: str, kind: str, rate_bps: int, threshold: int, description: str) -> AccrualRun:
+    """Record the run if it is new and return it; an existing run is returned unchanged."""
+    db.execute(pg_insert(AccrualRun).values(
+        id=run_id, kind=kind, rateBps=rate_bps, threshold=threshold, description=description,
+        status=RUNNING, operations=0, totalAmount=0, createdAt=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=[AccrualRun.id]))
+    db.commit()
+    return db.get(AccrualRun, run_id)
+
+
+def preview_accrual(db: Session, kind: str, rate_bps: int, threshold: int, after: str = None) -> dict:
+    """Clients and total a run would touch from after onwards, in one aggregate query, writing nothing."""
+    row = db.execute(text(ACCRUAL_PREVIEW_SQL), {
+        "threshold": threshold, "rate_bps": rate_bps, "after": after or ZERO_UUID
+    }).mappings().one()
+    return {"clients": row["clients"], "totalAmount": SIGNS[kind] * row["total"]}
+
+
+def run_accrual(db: Session, run_id: str, chunk_size: int) -> dict:
+    """Apply whatever is left of run_id, one committed chunk of clients at a time."""
+    while True:
+        # Locking the run row makes a second caller with the same id wait, then pick up after this one
+        run = db.query(AccrualRun).filter(AccrualRun.id == run_id).with_for_update().one()
+        if run.status == COMPLETED:
+            break
+        chunk = db.execute(text(ACCRUAL_CHUNK_SQL), {
+            "threshold": run.threshold,
+            "rate_bps": run.rateBps,
+            "after": run.lastClientId or ZERO_UUID,
+            "limit": chunk_size,
+            "sign": SIGNS[run.kind],
+            "description": run.description,
+            "reference": accrual_reference(run.id)
+        }).mappings().one()
+        if chunk["scanned"] == 0:
+            run.status = COMPLETED
+            run.completedAt = datetime.utcnow()
+        else:
+            run.lastClientId = str(chunk["lastClientId"])
+            run.operations += chunk["operations"]
+            run.totalAmount += chunk["totalAmount"]
+        db.commit()
+    logger.info(f"Accrual run {run.id} completed: {run.operations} operations, total {run.totalAmount}")
+    return accrual_summary(run)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    """Merges concurrent submissions into batches for one flush call each.
+
+    A batch is flushed window_ms after its first item arrives, or as soon as it reaches
+    max_batch items. flush_batch(items) must return one result per item, in order; a result
+    that is an exception is raised to that item's caller only.
+    """
+
+    def __init__(self, flush_batch, window_ms: float = 5, max_batch: int = 100):
+        self.flush_batch = flush_batch
+        self.window_seconds = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        # Strong references so in-flight flushes are not garbage collected
+        self._flushes = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush_pending)
+        return await future
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch):
+        try:
+            results = await self.flush_batch([item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} items failed: {e}")
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,260 @@
+"""Incremental ledger reconciliation.
+
+Each check walks one source table in key order from a checkpoint kept in
+reconciliation_checkpoint and looks at no more than chunk_size rows per run, so a run costs
+the same however large the tables get. Findings go to reconciliation_issue (one row per
+check and subject). They commit together with the new checkpoint, so a run that dies halfway
+just repeats its chunk.
+"""
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import text, func
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models.ReconciliationCheckpoint import ReconciliationCheckpoint
+from models.ReconciliationIssue import ReconciliationIssue
+from models.BalanceTransaction import BalanceTransaction
+
+logger = logging.getLogger(__name__)
+
+DAILY_CLAIM_LINK = "daily_claim_link"
+BET_SETTLEMENT = "bet_settlement"
+TRANSFER_PAIR = "transfer_pair"
+CHECKS = (DAILY_CLAIM_LINK, BET_SETTLEMENT, TRANSFER_PAIR)
+
+EPOCH = "1970-01-01T00:00:00"
+ZERO_UUID = "00000000-0000-0000-0000-000000000000"
+
+# bet_api writes bet:<betEventId>:stake, :payout and :refund. The pieces are bound as parameters:
+# written into the SQL, their colons would be read as bind parameter names.
+BET_REFERENCE_PREFIX = "bet:"
+BET_REFERENCE_SUFFIXES = {"stake": ":stake", "payout": ":payout", "refund": ":refund"}
+BET_REFERENCES_SQL = ", ".join(
+    f'CAST(:bet_prefix AS text) || e."id" || :{kind}_suffix' for kind in BET_REFERENCE_SUFFIXES
+)
+
+
+def load_position(db: Session, check: str, default: dict) -> dict:
+    row = db.get(ReconciliationCheckpoint, check)
+    return dict(row.position) if row else dict(default)
+
+
+def save_position(db: Session, check: str, position: dict):
+    stmt = pg_insert(ReconciliationCheckpoint).values(check=check, position=position, updatedAt=datetime.utcnow())
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ReconciliationCheckpoint.check],
+        set_={"position": stmt.excluded.position, "updatedAt": stmt.excluded.updatedAt}
+    ))
+
+
+def record_issues(db: Session, check: str, issues: dict):
+    """Upsert {subject: detail}; a subject found again gets its detail and detectedAt refreshed."""
+    if not issues:
+        return
+    now = datetime.utcnow()
+    rows = [{"check": check, "subject": subject, "detail": detail, "detectedAt": now} for subject, detail in issues.items()]
+    stmt = pg_insert(ReconciliationIssue).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        constraint="UQ_reconciliation_issue_check_subject",
+        set_={"detail": stmt.excluded.detail, "detectedAt": stmt.excluded.detectedAt}
+    ))
+
+
+def finish_chunk(db: Session, check: str, position: dict, checked: int, issues: dict) -> dict:
+    record_issues(db, check, issues)
+    save_position(db, check, position)
+    db.commit()
+    if issues:
+        logger.warning(f"Reconciliation check {check} found {len(issues)} issues in {checked} rows")
+    return {"checked": checked, "issues": len(issues)}
+
+
+def check_daily_claims(db: Session, chunk_size: int, settle_seconds: int) -> dict:
+    """Every daily claim must point at an operation crediting the same client the same amount."""
+    position = load_position(db, DAILY_CLAIM_LINK, {"createdAt": EPOCH, "id": ZERO_UUID})
+    rows = db.execute(text(
+        'SELECT c."id", c."clientId", c."amount", c."balanceOperationId", c."createdAt", '
+        'o."clientId" AS "operationClientId", o."amount" AS "operationAmount" '
+        'FROM ('
+        '  SELECT * FROM daily_claim '
+        '  WHERE ("createdAt", "id") > (:created_at, CAST(:id AS uuid)) AND "createdAt" < :settled_before '
+        '  ORDER BY "createdAt", "id" LIMIT :limit'
+        ') c LEFT JOIN LATERAL ('
+        '  SELECT "clientId", "amount" FROM balance_operation WHERE "id" = c."balanceOperationId" '
+        '  UNION ALL SELECT "clientId", "amount" FROM balance_operation_archive WHERE "id" = c."balanceOperationId" '
+        '  LIMIT 1'
+        ') o ON true ORDER BY c."createdAt", c."id"'
+    ), {
+        "created_at": datetime.fromisoformat(position["createdAt"]),
+        "id": position["id"],
+        "settled_before": datetime.utcnow() - timedelta(seconds=settle_seconds),
+        "limit": chunk_size
+    }).mappings().all()
+
+    issues = {}
+    for row in rows:
+        detail = {"claimId": str(row["id"]), "balanceOperationId": str(row["balanceOperationId"])}
+        if row["operationAmount"] is None:
+            issues[str(row["id"])] = {**detail, "problem": "balance operation not found"}
+        elif str(row["operationClientId"]) != str(row["clientId"]):
+            issues[str(row["id"])] = {**detail, "problem": "balance operation belongs to another client"}
+        elif row["operationAmount"] != row["amount"]:
+            issues[str(row["id"])] = {
+                **detail, "problem": "amount differs", "claimed": row["amount"], "credited": row["operationAmount"]
+            }
+    if rows:
+        position = {"createdAt": rows[-1]["createdAt"].isoformat(), "id": str(rows[-1]["id"])}
+    return finish_chunk(db, DAILY_CLAIM_LINK, position, len(rows), issues)
+
+
+def check_bet_settlements(db: Session, chunk_size: int, settle_seconds: int) -> dict:
+    """Closed bet events must agree with the ledger: stakes, payouts and refunds against the pool.
+
+    Only events created after the check first ran are covered, since older stakes and payouts
+    were written without a reference to find them by.
+    """
+    position = load_position(db, BET_SETTLEMENT, {"since": datetime.utcnow().isoformat(), "updatedAt": EPOCH, "id": 0})
+    rows = db.execute(text(
+        'SELECT e."id", e."isFinished", e."winningOption", e."totalBetAmount", e."updatedAt", '
+        'b."betTotal", b."winningTotal", b."winners", l."staked", l."paid", l."refunded" '
+        'FROM ('
+        '  SELECT * FROM bet_event '
+        '  WHERE ("updatedAt", "id") > (:updated_at, CAST(:id AS integer)) AND "updatedAt" < :settled_before '
+        '  AND ("isFinished" OR NOT "isActive") AND "createdAt" >= :since '
+        '  ORDER BY "updatedAt", "id" LIMIT :limit'
+        ') e LEFT JOIN LATERAL ('
+        '  SELECT COALESCE(SUM("amount"), 0) AS "betTotal", '
+        '  COALESCE(SUM("amount") FILTER (WHERE "chosenOption" = e."winningOption"), 0) AS "winningTotal", '
+        '  COUNT(*) FILTER (WHERE "chosenOption" = e."winningOption") AS "winners" '
+        '  FROM user_bet WHERE "betEventId" = e."id"'
+        ') b ON true LEFT JOIN LATERAL ('
+        '  SELECT COALESCE(-SUM("amount") FILTER (WHERE "reference" LIKE :stake_pattern), 0) AS "staked", '
+        '  COALESCE(SUM("amount") FILTER (WHERE "reference" LIKE :payout_pattern), 0) AS "paid", '
+        '  COALESCE(SUM("amount") FILTER (WHERE "reference" LIKE :refund_pattern), 0) AS "refunded" '
+        '  FROM ('
+        f'    SELECT "reference", "amount" FROM balance_operation WHERE "reference" IN ({BET_REFERENCES_SQL})'
+        f'    UNION ALL SELECT "reference", "amount" FROM balance_operation_archive WHERE "reference" IN ({BET_REFERENCES_SQL})'
+        '  ) r'
+        ') l ON true ORDER BY e."updatedAt", e."id"'
+    ), {
+        "updated_at": datetime.fromisoformat(position["updatedAt"]),
+        "id": position["id"],
+        "since": datetime.fromisoformat(position["since"]),
+        "settled_before": datetime.utcnow() - timedelta(seconds=settle_seconds),
+        "limit": chunk_size,
+        "bet_prefix": BET_REFERENCE_PREFIX,
+        **{f"{kind}_suffix": suffix for kind, suffix in BET_REFERENCE_SUFFIXES.items()},
+        **{f"{kind}_pattern": f"%{suffix}" for kind, suffix in BET_REFERENCE_SUFFIXES.items()}
+    }).mappings().all()
+
+    issues = {}
+    for row in rows:
+        pool = row["totalBetAmount"]
+        problems = []
+        if row["betTotal"] != pool:
+            problems.append(f"bets add up to {row['betTotal']}, pool is {pool}")
+        if row["staked"] != pool:
+            problems.append(f"stake debits add up to {row['staked']}, pool is {pool}")
+        if row["isFinished"]:
+            if row["winningTotal"] > 0 and not (pool - row["winners"] < row["paid"] <= pool):
+                # Each winner's share is rounded down, so up to one coin per winner may stay unpaid
+                problems.append(f"payouts add up to {row['paid']} for a pool of {pool} and {row['winners']} winners")
+            if row["winningTotal"] == 0 and row["paid"] != 0:
+                problems.append(f"paid {row['paid']} although nobody won")
+            if row["refunded"] != 0:
+                problems.append(f"refunded {row['refunded']} on a finished event")
+        else:
+            if row["refunded"] != row["betTotal"]:
+                problems.append(f"refunded {row['refunded']} of {row['betTotal']} staked on a cancelled event")
+            if row["paid"] != 0:
+                problems.append(f"paid {row['paid']} on a cancelled event")
+        if problems:
+            issues[f"bet_event:{row['id']}"] = {"betEventId": row["id"], "problems": problems}
+    if rows:
+        position = {**position, "updatedAt": rows[-1]["updatedAt"].isoformat(), "id": rows[-1]["id"]}
+    return finish_chunk(db, BET_SETTLEMENT, position, len(rows), issues)
+
+
+def check_transfers(db: Session, chunk_size: int, settle_seconds: int) -> dict:
+    """Each transfer's legs must debit and credit exactly the amount on its balance_transaction.
+
+    Walks operations in change-feed order, which only ever grows at the end, so no settle delay
+    is needed. Legs are grouped by transactionId; transfers from before balance_transaction
+    existed have none and are skipped.
+    """
+    position = load_position(db, TRANSFER_PAIR, {"seq": 0})
+    rows = db.execute(text(
+        'SELECT "seq", "id", "clientId", "amount", "txid", "transactionId" FROM ('
+        '  SELECT "seq", "id", "clientId", "amount", "txid", "transactionId" FROM balance_operation WHERE "seq" > :seq '
+        '  UNION ALL SELECT "seq", "id", "clientId", "amount", "txid", "transactionId" '
+        '  FROM balance_operation_archive WHERE "seq" > :seq'
+        ') ops ORDER BY "seq" LIMIT :limit'
+    ), {"seq": position["seq"], "limit": chunk_size}).mappings().all()
+    if len(rows) == chunk_size:
+        # A database transaction's rows are numbered consecutively; leave one the chunk cut short for next time
+        complete = [row for row in rows if row["txid"] != rows[-1]["txid"]]
+        rows = complete or rows
+
+    legs_by_transaction = {}
+    for row in rows:
+        if row["transactionId"]:
+            legs_by_transaction.setdefault(str(row["transactionId"]), []).append(row)
+    amounts = dict(
+        db.query(BalanceTransaction.id, BalanceTransaction.amount)
+        .filter(BalanceTransaction.id.in_(list(legs_by_transaction)))
+        .all()
+    ) if legs_by_transaction else {}
+    issues = {}
+    for transaction_id, legs in legs_by_transaction.items():
+        debited = -sum(leg["amount"] for leg in legs if leg["amount"] < 0)
+        credited = sum(leg["amount"] for leg in legs if leg["amount"] > 0)
+        amount = amounts.get(transaction_id)
+        if amount is None or debited != amount or credited != amount:
+            issues[f"transaction:{transaction_id}"] = {
+                "problem": "transfer legs do not match the transaction" if amount is not None else "transaction record not found",
+                "amount": amount,
+                "debited": debited,
+                "credited": credited,
+                "legs": [{"id": str(leg["id"]), "clientId": str(leg["clientId"]), "amount": leg["amount"]} for leg in legs]
+            }
+    if rows:
+        position = {"seq": rows[-1]["seq"]}
+    return finish_chunk(db, TRANSFER_PAIR, position, len(rows), issues)
+
+
+def run_reconciliation(db: Session, chunk_size: int, settle_seconds: int) -> dict:
+    """One bounded chunk of every check; a failing check does not stop the others."""
+    results = {}
+    for check, fn in ((DAILY_CLAIM_LINK, check_daily_claims), (BET_SETTLEMENT, check_bet_settlements), (TRANSFER_PAIR, check_transfers)):
+        try:
+            results[check] = fn(db, chunk_size, settle_seconds)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Reconciliation check {check} failed: {e}")
+            results[check] = {"error": str(e)}
+    return results
+
+
+def reconciliation_report(db: Session, check: str = None, limit: int = 100) -> dict:
+    counts = dict(
+        db.query(ReconciliationIssue.check, func.count(ReconciliationIssue.id)).group_by(ReconciliationIssue.check).all()
+    )
+    query = db.query(ReconciliationIssue)
+    if check:
+        query = query.filter(ReconciliationIssue.check == check)
+    issues = query.order_by(ReconciliationIssue.detectedAt.desc()).limit(limit).all()
+    checkpoints = db.query(ReconciliationCheckpoint).all()
+    return {
+        "checks": {
+            name: {
+                "issueCount": counts.get(name, 0),
+                "position": next((c.position for c in checkpoints if c.check == name), None),
+                "updatedAt": next((c.updatedAt for c in checkpoints if c.check == name), None)
+            }
+            for name in CHECKS
+        },
+        "issues": [
+            {"check": issue.check, "subject": issue.subject, "detail": issue.detail, "detectedAt": issue.detectedAt}
+            for issue in issues
+        ]
+    }
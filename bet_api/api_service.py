@@ -2,11 +2,13 @@ from fastapi import FastAPI, HTTPException
 from typing import List
 from sqlalchemy.orm import Session
 from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
 import requests
 import logging
+from shared.http_retry import post_with_retry
 from models.BetEvent import BetEvent, Base
 from models.BetEventCreate import BetEventCreate
 from models.UserBet import UserBet
@@ -24,6 +26,8 @@ logger = logging.getLogger(__name__)
 DATABASE_URL = os.getenv("DATABASE_URL")
 BALANCE_API_URL = os.getenv("BALANCE_API_URL")
 CLIENT_API_URL = os.getenv("CLIENT_API_URL")
+BALANCE_API_RETRIES = int(os.getenv("BALANCE_API_RETRIES", 3))
+BALANCE_API_TIMEOUT = float(os.getenv("BALANCE_API_TIMEOUT", 5))
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -44,44 +48,48 @@ def get_db():
     finally:
         db.close()
 
-def check_user_balance(user_id: str, amount: int) -> bool:
-    """Check if user has sufficient balance"""
-    try:
-        response = requests.get(f"{BALANCE_API_URL}/balance/{user_id}")
-        if response.status_code != 200:
-            return False
-        balance_data = response.json()
-        return balance_data.get("balance", 0) >= amount
-    except Exception as e:
-        logger.error(f"Error checking user balance: {e}")
-        return False
-
-def subtract_user_balance(user_id: str, amount: int, description: str) -> bool:
-    """Subtract amount from user balance"""
+def debit_user_balance(user_id: str, amount: int, description: str, idempotency_key: str, reference: str = None) -> int:
+    """Atomically subtract amount if the user can afford it; returns the balance API status code"""
     try:
         payload = {
             "clientId": user_id,
             "amount": amount,
-            "description": description
+            "description": description,
+            "reference": reference
         }
-        response = requests.post(f"{BALANCE_API_URL}/balance/subtract", json=payload)
-        return response.status_code == 200
+        response = post_with_retry(
+            f"{BALANCE_API_URL}/balance/debit", payload, idempotency_key,
+            retries=BALANCE_API_RETRIES, timeout=BALANCE_API_TIMEOUT
+        )
+        return response.status_code
     except Exception as e:
-        logger.error(f"Error subtracting user balance: {e}")
-        return False
+        logger.error(f"Error debiting user balance: {e}")
+        return 503
 
-def add_user_balance(user_id: str, amount: int, description: str) -> bool:
-    """Add amount to user balance"""
+def add_user_balances(entries: List[dict], idempotency_key: str) -> bool:
+    """Credit several users in one balance transaction; entries are dicts with userId, amount, description and reference"""
+    if not entries:
+        return True
     try:
         payload = {
-            "clientId": user_id,
-            "amount": amount,
-            "description": description
+            "operations": [
+                {
+                    "clientId": entry["userId"],
+                    "amount": entry["amount"],
+                    "description": entry["description"],
+                    "reference": entry.get("reference"),
+                    "type": "add"
+                }
+                for entry in entries
+            ]
         }
-        response = requests.post(f"{BALANCE_API_URL}/balance/add", json=payload)
+        response = post_with_retry(
+            f"{BALANCE_API_URL}/balance/batch", payload, idempotency_key,
+            retries=BALANCE_API_RETRIES, timeout=BALANCE_API_TIMEOUT
+        )
         return response.status_code == 200
     except Exception as e:
-        logger.error(f"Error adding user balance: {e}")
+        logger.error(f"Error adding user balances: {e}")
         return False
 
 @app.post("/bet/event")
@@ -164,6 +172,42 @@ def get_finished_events():
     finally:
         db.close()
 
+def settle_pending_bet(db: Session, bet: UserBet, event_title: str) -> int:
+    """Debit a pending bet's stake and mark it placed, or drop it if the user cannot afford it; returns the debit status code"""
+    bet_id, user_id, event_id, option, amount = bet.id, bet.userId, bet.betEventId, bet.chosenOption, bet.amount
+    # No transaction stays open while the balance API is called
+    db.commit()
+    
+    # A user bets once per event, so (event, user) identifies the stake across retries
+    debit_status = debit_user_balance(
+        user_id, amount, f"Bet on {event_title}", f"bet-place:{event_id}:{user_id}",
+        reference=f"bet:{event_id}:stake"
+    )
+    pending = db.query(UserBet).filter(UserBet.id == bet_id, UserBet.status == "pending")
+    if debit_status == 409:
+        pending.delete(synchronize_session=False)
+        db.commit()
+    elif debit_status == 200:
+        # Only the request that flips the bet to placed adds it to the event totals
+        if pending.update({UserBet.status: "placed"}, synchronize_session=False):
+            option_column = BetEvent.option1BetAmount if option == 1 else BetEvent.option2BetAmount
+            db.query(BetEvent).filter(BetEvent.id == event_id).update({
+                BetEvent.totalBetAmount: BetEvent.totalBetAmount + amount,
+                option_column: option_column + amount
+            }, synchronize_session=False)
+        db.commit()
+    return debit_status
+
+def settle_pending_bets(db: Session, event: BetEvent):
+    """Settle every pending bet on an event so payouts and refunds only see debited stakes"""
+    pending_bets = db.query(UserBet).filter(
+        UserBet.betEventId == event.id,
+        UserBet.status == "pending"
+    ).all()
+    for bet in pending_bets:
+        if settle_pending_bet(db, bet, event.title) not in (200, 409):
+            raise HTTPException(status_code=500, detail="Failed to settle pending bets")
+
 @app.post("/bet/place")
 def place_bet(bet: UserBetCreate):
     """Place a bet on an event"""
@@ -183,40 +227,42 @@ def place_bet(bet: UserBetCreate):
         
         if not event:
             raise HTTPException(status_code=404, detail="Event not found or not active")
+        event_title = event.title
         
-        existing_bet = db.query(UserBet).filter(
+        db_bet = db.query(UserBet).filter(
             UserBet.userId == bet.userId,
             UserBet.betEventId == bet.betEventId
         ).first()
         
-        if existing_bet:
+        if db_bet and db_bet.status != "pending":
             raise HTTPException(status_code=400, detail="User already placed a bet on this event")
         
-        if not check_user_balance(bet.userId, bet.amount):
-            raise HTTPException(status_code=400, detail="Insufficient balance")
+        # A pending bet is left behind when an earlier attempt failed after or during its debit;
+        # a retry finishes it as first placed so the replayed debit matches the original amount
+        if not db_bet:
+            db_bet = UserBet(
+                userId=bet.userId,
+                betEventId=bet.betEventId,
+                chosenOption=bet.chosenOption,
+                amount=bet.amount
+            )
+            db.add(db_bet)
+            try:
+                # Claims the (event, user) slot before any money moves
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise HTTPException(status_code=400, detail="User already placed a bet on this event")
+        bet_id = db_bet.id
         
-        if not subtract_user_balance(bet.userId, bet.amount, f"Bet on {event.title}"):
+        debit_status = settle_pending_bet(db, db_bet, event_title)
+        if debit_status == 409:
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+        if debit_status != 200:
             raise HTTPException(status_code=500, detail="Failed to subtract balance")
         
-        db_bet = UserBet(
-            userId=bet.userId,
-            betEventId=bet.betEventId,
-            chosenOption=bet.chosenOption,
-            amount=bet.amount
-        )
-        db.add(db_bet)
-        
-        event.totalBetAmount += bet.amount
-        if bet.chosenOption == 1:
-            event.option1BetAmount += bet.amount
-        else:
-            event.option2BetAmount += bet.amount
-        
-        db.commit()
-        db.refresh(db_bet)
-        
-        logger.info(f"User {bet.userId} placed bet {db_bet.id} on event {bet.betEventId}")
-        return {"message": "Bet placed successfully", "betId": db_bet.id}
+        logger.info(f"User {bet.userId} placed bet {bet_id} on event {bet.betEventId}")
+        return {"message": "Bet placed successfully", "betId": bet_id}
         
     except HTTPException:
         db.rollback()
@@ -245,9 +291,11 @@ def finalize_bet(finalize_data: BetFinalize):
         if not event:
             raise HTTPException(status_code=404, detail="Event not found or already finished")
         
+        settle_pending_bets(db, event)
         winning_bets = db.query(UserBet).filter(
             UserBet.betEventId == finalize_data.betEventId,
-            UserBet.chosenOption == finalize_data.winningOption
+            UserBet.chosenOption == finalize_data.winningOption,
+            UserBet.status == "placed"
         ).all()
         
         winning_total = sum(bet.amount for bet in winning_bets)
@@ -265,19 +313,26 @@ def finalize_bet(finalize_data: BetFinalize):
         for bet in winning_bets:
             proportion = bet.amount / winning_total
             winnings = int(total_pool * proportion)
-            
-            if add_user_balance(
-                bet.userId, 
-                winnings, 
-                f"Winnings from {event.title} - Option {finalize_data.winningOption}"
-            ):
-                distributions.append({
-                    "userId": bet.userId,
-                    "originalBet": bet.amount,
-                    "winnings": winnings,
-                    "profit": winnings - bet.amount
-                })
-                logger.info(f"Distributed {winnings} to user {bet.userId}")
+            distributions.append({
+                "userId": bet.userId,
+                "originalBet": bet.amount,
+                "winnings": winnings,
+                "profit": winnings - bet.amount
+            })
+        
+        # All winners are paid in a single balance transaction, so a failure pays nobody
+        payouts = [
+            {
+                "userId": d["userId"],
+                "amount": d["winnings"],
+                "description": f"Winnings from {event.title} - Option {finalize_data.winningOption}",
+                "reference": f"bet:{event.id}:payout"
+            }
+            for d in distributions
+        ]
+        if not add_user_balances(payouts, f"bet-finalize:{event.id}"):
+            raise HTTPException(status_code=500, detail="Failed to distribute winnings")
+        logger.info(f"Distributed {sum(p['amount'] for p in payouts)} to {len(payouts)} winners")
         
         event.isFinished = True
         event.winningOption = finalize_data.winningOption
@@ -320,6 +375,7 @@ def get_user_bets(user_id: str):
                     "chosenOption": bet.chosenOption,
                     "chosenOptionText": event.option1 if bet.chosenOption == 1 else event.option2,
                     "amount": bet.amount,
+                    "status": bet.status,
                     "isFinished": event.isFinished,
                     "winningOption": event.winningOption,
                     "isWinner": event.isFinished and event.winningOption == bet.chosenOption,
@@ -343,7 +399,10 @@ def get_event_details(event_id: str):
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
         
-        bets = db.query(UserBet).filter(UserBet.betEventId == event_id).all()
+        bets = db.query(UserBet).filter(
+            UserBet.betEventId == event_id,
+            UserBet.status == "placed"
+        ).all()
         
         return {
             "event": {
@@ -387,13 +446,24 @@ def cancel_bet_event(event_id: str):
         if not event:
             raise HTTPException(status_code=404, detail="Event not found or already finished")
         
-        bets = db.query(UserBet).filter(UserBet.betEventId == event_id).all()
+        settle_pending_bets(db, event)
+        bets = db.query(UserBet).filter(
+            UserBet.betEventId == event_id,
+            UserBet.status == "placed"
+        ).all()
         
-        refunded_count = 0
-        for bet in bets:
-            if add_user_balance(bet.userId, bet.amount, f"Refund for cancelled event: {event.title}"):
-                refunded_count += 1
-                logger.info(f"Refunded {bet.amount} to user {bet.userId}")
+        refunds = [
+            {
+                "userId": bet.userId,
+                "amount": bet.amount,
+                "description": f"Refund for cancelled event: {event.title}",
+                "reference": f"bet:{event.id}:refund"
+            }
+            for bet in bets
+        ]
+        if not add_user_balances(refunds, f"bet-cancel:{event.id}"):
+            raise HTTPException(status_code=500, detail="Failed to refund bets")
+        refunded_count = len(refunds)
         
         event.isActive = False
         db.commit()
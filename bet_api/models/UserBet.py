@@ -12,6 +12,7 @@ class UserBet(Base):
     betEventId = Column(Integer, nullable=False)
     chosenOption = Column(Integer, nullable=False)  # 1 or 2
     amount = Column(Integer, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending until the stake is debited, then placed
     createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
     updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -23,4 +24,4 @@ class UserBet(Base):
 
     def __repr__(self):
         return (f"UserBet(id={self.id}, userId={self.userId}, betEventId={self.betEventId}, "
-                f"chosenOption={self.chosenOption}, amount={self.amount})")
+                f"chosenOption={self.chosenOption}, amount={self.amount}, status={self.status})")
@@ -4,14 +4,21 @@ Enhanced Balance Commands with UI Components
 from discord import app_commands
 import discord
 import aiohttp
-from tools.utils import get_or_create_user, make_api_request, requires_registration
+import asyncio
+import io
+from typing import Optional
+from tools.utils import get_or_create_user, get_or_create_users, make_api_request, requires_registration
 from tools.constants import BALANCE_API_URL, CLIENT_API_URL
 from ui.modals import TransferCoinsModal
-from ui.views import PaginationView
+from ui.views import PaginationView, CursorPaginationView
+from tools.wealth_graph import WealthGraph
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+LEADERBOARD_SIZE = 100
+
 
 def balance_commands(bot):
     """Register balance commands with UI enhancements"""
@@ -35,8 +42,8 @@ def balance_commands(bot):
             """Handle transfer from modal"""
             await interaction.response.defer(ephemeral=True)
             
-            sender = await get_or_create_user(str(interaction.user.id), interaction.user.display_name)
-            receiver = await get_or_create_user(str(recipient.id), recipient.display_name)
+            users = await get_or_create_users([interaction.user, recipient])
+            sender, receiver = users.get(str(interaction.user.id)), users.get(str(recipient.id))
             
             if not sender or not receiver:
                 embed = discord.Embed(
@@ -48,29 +55,6 @@ def balance_commands(bot):
                 return
             
             async with aiohttp.ClientSession() as session:
-                status, balance_data = await make_api_request(
-                    session, 'GET', f"{BALANCE_API_URL}/balance/{sender['id']}"
-                )
-                
-                if status != 200:
-                    embed = discord.Embed(
-                        title="❌ Erro",
-                        description="Falha ao verificar saldo.",
-                        color=discord.Color.red()
-                    )
-                    await interaction.followup.send(embed=embed, ephemeral=True)
-                    return
-                
-                current_balance = balance_data.get('balance', 0)
-                if current_balance < amount:
-                    embed = discord.Embed(
-                        title="❌ Saldo Insuficiente",
-                        description=f"Você tem **{current_balance:,} moedas**, mas precisa de **{amount:,} moedas**.",
-                        color=discord.Color.red()
-                    )
-                    await interaction.followup.send(embed=embed, ephemeral=True)
-                    return
-                
                 transfer_data = {
                     "senderId": sender['id'],
                     "receiverId": receiver['id'],
@@ -78,21 +62,29 @@ def balance_commands(bot):
                     "description": description
                 }
                 
+                # The balance API checks funds and transfers atomically; 409 means insufficient balance
                 status, response = await make_api_request(
                     session, 'POST', f"{BALANCE_API_URL}/balance/transaction", transfer_data
                 )
                 
                 if status == 200:
-                    new_balance = current_balance - amount
+                    new_balance = response.get('senderBalance', 0)
                     embed = discord.Embed(
                         title="✅ Transferência Realizada!",
                         description=f"Você transferiu **{amount:,} moedas** para {recipient.mention}",
                         color=discord.Color.green()
                     )
                     embed.add_field(name="💬 Descrição", value=description, inline=False)
-                    embed.add_field(name="💰 Seu Saldo Anterior", value=f"{current_balance:,} moedas", inline=True)
+                    embed.add_field(name="💰 Seu Saldo Anterior", value=f"{new_balance + amount:,} moedas", inline=True)
                     embed.add_field(name="💵 Seu Saldo Atual", value=f"{new_balance:,} moedas", inline=True)
                     embed.set_thumbnail(url=recipient.display_avatar.url)
+                elif status == 409:
+                    current_balance = response.get('detail', {}).get('balance', 0) if isinstance(response, dict) else 0
+                    embed = discord.Embed(
+                        title="❌ Saldo Insuficiente",
+                        description=f"Você tem **{current_balance:,} moedas**, mas precisa de **{amount:,} moedas**.",
+                        color=discord.Color.red()
+                    )
                 else:
                     embed = discord.Embed(
                         title="❌ Falha na Transferência",
@@ -106,13 +98,136 @@ def balance_commands(bot):
         modal = TransferCoinsModal(recipient=recipient, callback=handle_transfer)
         await interaction.response.send_modal(modal)
     
+    @bot.tree.command(name="transferir_varios", description="Transfira moedas para vários usuários de uma vez")
+    @app_commands.describe(
+        quantidade="Moedas para cada usuário (ou o total, se dividir for verdadeiro)",
+        membro1="Primeiro usuário",
+        membro2="Segundo usuário",
+        membro3="Terceiro usuário",
+        membro4="Quarto usuário",
+        membro5="Quinto usuário",
+        dividir="Dividir a quantidade entre todos em vez de enviar a quantidade para cada um",
+        descricao="Motivo da transferência"
+    )
+    @requires_registration()
+    async def transferir_varios(
+        interaction: discord.Interaction,
+        quantidade: int,
+        membro1: discord.Member,
+        membro2: Optional[discord.Member] = None,
+        membro3: Optional[discord.Member] = None,
+        membro4: Optional[discord.Member] = None,
+        membro5: Optional[discord.Member] = None,
+        dividir: bool = False,
+        descricao: Optional[str] = None
+    ):
+        """Pay several members in a single balance transaction"""
+        await interaction.response.defer(ephemeral=True)
+        
+        recipients = []
+        for member in (membro1, membro2, membro3, membro4, membro5):
+            if member and member.id != interaction.user.id and member not in recipients:
+                recipients.append(member)
+        
+        if not recipients or quantidade <= 0 or (dividir and quantidade < len(recipients)):
+            embed = discord.Embed(
+                title="❌ Transferência Inválida",
+                description="Escolha pelo menos um outro usuário e uma quantidade positiva que dê para todos.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        if dividir:
+            # The first members get the leftover coins when the total does not split evenly
+            share, leftover = divmod(quantidade, len(recipients))
+            amounts = [share + (1 if i < leftover else 0) for i in range(len(recipients))]
+        else:
+            amounts = [quantidade] * len(recipients)
+        total = sum(amounts)
+        description = descricao or "Transferência de moedas"
+        
+        users = await get_or_create_users([interaction.user, *recipients])
+        sender = users.get(str(interaction.user.id))
+        receivers = [users.get(str(member.id)) for member in recipients]
+        if not sender or not all(receivers):
+            embed = discord.Embed(
+                title="❌ Usuário Não Encontrado",
+                description="Um ou mais usuários não estão registrados.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        async with aiohttp.ClientSession() as session:
+            transfer_data = {
+                "senderId": sender['id'],
+                "receivers": [
+                    {"receiverId": receiver['id'], "amount": amount}
+                    for receiver, amount in zip(receivers, amounts)
+                ],
+                "description": description
+            }
+            # One debit and all credits are written atomically; 409 means the total is not covered
+            status, response = await make_api_request(
+                session, 'POST', f"{BALANCE_API_URL}/balance/transaction/multi", transfer_data
+            )
+        
+        if status == 200:
+            new_balance = response.get('senderBalance', 0)
+            embed = discord.Embed(
+                title="✅ Transferência Realizada!",
+                description=f"Você transferiu **{total:,} moedas** para {len(recipients)} usuários",
+                color=discord.Color.green()
+            )
+            embed.add_field(
+                name="👥 Destinatários",
+                value="\n".join(f"{member.mention}: {amount:,} moedas" for member, amount in zip(recipients, amounts)),
+                inline=False
+            )
+            embed.add_field(name="💬 Descrição", value=description, inline=False)
+            embed.add_field(name="💰 Seu Saldo Anterior", value=f"{new_balance + total:,} moedas", inline=True)
+            embed.add_field(name="💵 Seu Saldo Atual", value=f"{new_balance:,} moedas", inline=True)
+        elif status == 409:
+            current_balance = response.get('detail', {}).get('balance', 0) if isinstance(response, dict) else 0
+            embed = discord.Embed(
+                title="❌ Saldo Insuficiente",
+                description=f"Você tem **{current_balance:,} moedas**, mas precisa de **{total:,} moedas**.",
+                color=discord.Color.red()
+            )
+        else:
+            embed = discord.Embed(
+                title="❌ Falha na Transferência",
+                description="Falha ao completar a transferência. Tente novamente.",
+                color=discord.Color.red()
+            )
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
     @bot.tree.command(name="faria_limers", description="Ranking dos usuários mais ricos com interface visual")
     async def top_patroes(interaction: discord.Interaction):
         """Show leaderboard with enhanced UI"""
         await interaction.response.defer()
         
         async with aiohttp.ClientSession() as session:
-            status, users = await make_api_request(session, 'GET', f"{CLIENT_API_URL}/client/")
+            status, leaderboard = await make_api_request(
+                session, 'GET', f"{BALANCE_API_URL}/balance/leaderboard?limit={LEADERBOARD_SIZE}"
+            )
+            
+            if status != 200:
+                embed = discord.Embed(
+                    title="❌ Erro",
+                    description="Falha ao obter o ranking.",
+                    color=discord.Color.red()
+                )
+                await interaction.followup.send(embed=embed)
+                return
+            
+            # Only the ranked users and the caller are needed, resolved together in one call
+            status, resolved = await make_api_request(session, 'POST', f"{CLIENT_API_URL}/client/batch", {
+                "ids": [entry['user_id'] for entry in leaderboard.get('entries', [])],
+                "discordIds": [str(interaction.user.id)]
+            })
             
             if status != 200:
                 embed = discord.Embed(
@@ -123,16 +238,23 @@ def balance_commands(bot):
                 await interaction.followup.send(embed=embed)
                 return
             
-            user_balances = []
-            for user in users:
-                status, balance_data = await make_api_request(
-                    session, 'GET', f"{BALANCE_API_URL}/balance/{user['id']}"
+            users = resolved.get('clients', [])
+            users_by_id = {user['id']: user for user in users}
+            user_balances = [
+                (users_by_id[entry['user_id']], entry['balance'], entry['rank'])
+                for entry in leaderboard.get('entries', [])
+                if entry['user_id'] in users_by_id
+            ]
+            
+            # The caller's own position comes from the API, even when outside the top list
+            rank_text = None
+            own_user = next((user for user in users if user['discordId'] == str(interaction.user.id)), None)
+            if own_user:
+                status, rank_data = await make_api_request(
+                    session, 'GET', f"{BALANCE_API_URL}/balance/leaderboard/rank/{own_user['id']}"
                 )
                 if status == 200:
-                    balance = balance_data.get('balance', 0)
-                    user_balances.append((user, balance))
-            
-            user_balances.sort(key=lambda x: x[1], reverse=True)
+                    rank_text = f"Sua posição: #{rank_data['rank']} de {rank_data['total']}"
             
             # Create pages (10 users per page)
             items_per_page = 10
@@ -149,8 +271,7 @@ def balance_commands(bot):
                 
                 medals = ["🥇", "🥈", "🥉"]
                 
-                for i, (user, balance) in enumerate(page_items):
-                    actual_rank = page_num + i + 1
+                for user, balance, actual_rank in page_items:
                     medal = medals[actual_rank - 1] if actual_rank <= 3 else f"**{actual_rank}.**"
                     
                     try:
@@ -166,7 +287,10 @@ def balance_commands(bot):
                         inline=True
                     )
                 
-                embed.set_footer(text=f"Página {len(pages) + 1}/{(len(user_balances) + items_per_page - 1) // items_per_page}")
+                footer = f"Página {len(pages) + 1}/{(len(user_balances) + items_per_page - 1) // items_per_page}"
+                if rank_text:
+                    footer = f"{footer} • {rank_text}"
+                embed.set_footer(text=footer)
                 pages.append(embed)
             
             if not user_balances:
@@ -190,79 +314,136 @@ def balance_commands(bot):
         discord_id = str(interaction.user.id)
         user_data = await get_or_create_user(discord_id, interaction.user.display_name)
         
+        # 9 items per page to leave room for stats
+        items_per_page = 9
+        
         async with aiohttp.ClientSession() as session:
-            status, operations = await make_api_request(
-                session, 'GET', f"{BALANCE_API_URL}/balance/operations/{user_data['id']}"
+            status, summary = await make_api_request(
+                session, 'GET', f"{BALANCE_API_URL}/balance/operations/{user_data['id']}/summary"
             )
-            
+        
+        if status != 200:
+            embed = discord.Embed(
+                title="❌ Erro",
+                description="Falha ao obter histórico de transações.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        if summary.get('operationCount', 0) == 0:
+            embed = discord.Embed(
+                title="📊 Histórico de Transações",
+                description="Nenhuma transação encontrada.",
+                color=discord.Color.blue()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        total_income = summary.get('totalIncome', 0)
+        total_expense = summary.get('totalExpense', 0)
+        total_pages = (summary['operationCount'] + items_per_page - 1) // items_per_page
+        
+        async def fetch_page(cursor, page_index):
+            """Fetch one page of operations and render it as an embed"""
+            url = f"{BALANCE_API_URL}/balance/operations/{user_data['id']}?limit={items_per_page}"
+            if cursor:
+                url += f"&cursor={cursor}"
+            async with aiohttp.ClientSession() as session:
+                status, page = await make_api_request(session, 'GET', url)
             if status != 200:
-                embed = discord.Embed(
-                    title="❌ Erro",
-                    description="Falha ao obter histórico de transações.",
-                    color=discord.Color.red()
-                )
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
-            
-            if not operations:
-                embed = discord.Embed(
-                    title="📊 Histórico de Transações",
-                    description="Nenhuma transação encontrada.",
-                    color=discord.Color.blue()
-                )
-                await interaction.followup.send(embed=embed, ephemeral=True)
-                return
-            
-            operations.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
-            
-            # Calculate statistics
-            total_income = sum(op['amount'] for op in operations if op['amount'] > 0)
-            total_expense = sum(abs(op['amount']) for op in operations if op['amount'] < 0)
+                return None, None
             
-            # Create pages (9 items per page to leave room for stats)
-            items_per_page = 9
-            pages = []
+            embed = discord.Embed(
+                title="📊 Histórico de Transações",
+                description=f"📈 Total Recebido: **{total_income:,}** moedas\\n📉 Total Gasto: **{total_expense:,}** moedas",
+                color=discord.Color.blue()
+            )
             
-            for page_num in range(0, len(operations), items_per_page):
-                page_items = operations[page_num:page_num + items_per_page]
+            for operation in page.get('items', []):
+                amount = operation.get('amount', 0)
+                description = operation.get('description', 'Sem descrição')
+                created_at = operation.get('createdAt', '')
                 
-                embed = discord.Embed(
-                    title="📊 Histórico de Transações",
-                    description=f"📈 Total Recebido: **{total_income:,}** moedas\\n📉 Total Gasto: **{total_expense:,}** moedas",
-                    color=discord.Color.blue()
-                )
+                if amount > 0:
+                    amount_str = f"+{amount:,} moedas"
+                    color_emoji = "🟢"
+                else:
+                    amount_str = f"{amount:,} moedas"
+                    color_emoji = "🔴"
                 
-                for operation in page_items:
-                    amount = operation.get('amount', 0)
-                    description = operation.get('description', 'Sem descrição')
-                    created_at = operation.get('createdAt', '')
-                    
-                    if amount > 0:
-                        amount_str = f"+{amount:,} moedas"
-                        color_emoji = "🟢"
-                    else:
-                        amount_str = f"{amount:,} moedas"
-                        color_emoji = "🔴"
-                    
-                    try:
-                        from datetime import datetime
-                        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        date_str = dt.strftime('%d/%m/%Y %H:%M')
-                    except Exception as e:
-                        logger.error(f"Erro ao formatar data: {e}")
-                        date_str = "Desconhecido"
-                    
-                    embed.add_field(
-                        name=f"{color_emoji} {amount_str}",
-                        value=f"{description}\\n`{date_str}`",
-                        inline=True
-                    )
+                try:
+                    dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                    date_str = dt.strftime('%d/%m/%Y %H:%M')
+                except Exception as e:
+                    logger.error(f"Erro ao formatar data: {e}")
+                    date_str = "Desconhecido"
                 
-                embed.set_footer(text=f"Página {len(pages) + 1}/{(len(operations) + items_per_page - 1) // items_per_page}")
-                pages.append(embed)
+                embed.add_field(
+                    name=f"{color_emoji} {amount_str}",
+                    value=f"{description}\\n`{date_str}`",
+                    inline=True
+                )
             
-            if len(pages) == 1:
-                await interaction.followup.send(embed=pages[0], ephemeral=True)
-            else:
-                view = PaginationView(pages)
-                await interaction.followup.send(embed=pages[0], view=view, ephemeral=True)
+            embed.set_footer(text=f"Página {page_index + 1}/{total_pages}")
+            return embed, page.get('nextCursor')
+        
+        first_page, next_cursor = await fetch_page(None, 0)
+        if first_page is None:
+            embed = discord.Embed(
+                title="❌ Erro",
+                description="Falha ao obter histórico de transações.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+        elif next_cursor is None:
+            await interaction.followup.send(embed=first_page, ephemeral=True)
+        else:
+            view = CursorPaginationView(fetch_page, first_page, next_cursor)
+            await interaction.followup.send(embed=first_page, view=view, ephemeral=True)
+
+    @bot.tree.command(name="grafico_patrimonio", description="Veja a evolução do saldo ao longo do tempo")
+    @app_commands.describe(user="Usuário para ver o gráfico (padrão: você)", dias="Quantos dias mostrar (padrão: 30)")
+    async def grafico_patrimonio(interaction: discord.Interaction, user: Optional[discord.Member] = None, dias: int = 30):
+        """Render the user's daily balance series as a chart"""
+        await interaction.response.defer()
+        
+        target_user = user if user else interaction.user
+        user_data = await get_or_create_user(str(target_user.id), target_user.display_name)
+        
+        async with aiohttp.ClientSession() as session:
+            status, history = await make_api_request(
+                session, 'GET', f"{BALANCE_API_URL}/balance/history/{user_data['id']}?days={dias}"
+            )
+        
+        if status != 200:
+            embed = discord.Embed(
+                title="❌ Erro",
+                description="Falha ao obter histórico de saldo.",
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        series = history.get('series', [])
+        if not series:
+            embed = discord.Embed(
+                title="📈 Patrimônio",
+                description=f"{target_user.display_name} ainda não tem movimentações.",
+                color=discord.Color.blue()
+            )
+            await interaction.followup.send(embed=embed)
+            return
+        
+        # Rendering is CPU-bound and blocking, so keep it off the event loop
+        img_bytes = await asyncio.to_thread(WealthGraph().render_png, series, target_user.display_name)
+        file = discord.File(io.BytesIO(img_bytes), filename="patrimonio.png")
+        
+        first, last = series[0]['balance'], series[-1]['balance']
+        embed = discord.Embed(
+            title=f"📈 Patrimônio de {target_user.display_name}",
+            description=f"Últimos {history.get('days', dias)} dias: **{first:,}** → **{last:,}** moedas ({last - first:+,})",
+            color=discord.Color.blue()
+        )
+        embed.set_image(url="attachment://patrimonio.png")
+        await interaction.followup.send(embed=embed, file=file)
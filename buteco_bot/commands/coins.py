@@ -6,6 +6,7 @@ from discord import app_commands
 import discord
 import aiohttp
 from typing import Optional
+from datetime import datetime, timedelta
 from tools.utils import get_or_create_user, make_api_request, requires_registration
 from tools.constants import BALANCE_API_URL, COIN_API_URL
 from ui.views import PaginationView
@@ -145,6 +146,24 @@ def coins_commands(bot):
                         inline=True,
                     )
 
+                # Last week's movement, aggregated by balance-api instead of pulling the history
+                week_start = (datetime.utcnow() - timedelta(days=7)).isoformat()
+                status_stats, stats_data = await make_api_request(
+                    session,
+                    "GET",
+                    f"{BALANCE_API_URL}/balance/stats/{user_data['id']}?start={week_start}",
+                )
+                if status_stats == 200 and stats_data.get("operationCount", 0) > 0:
+                    net = stats_data["totalIncome"] - stats_data["totalExpense"]
+                    embed.add_field(
+                        name="📈 Últimos 7 dias",
+                        value=(
+                            f"+{stats_data['totalIncome']:,} / -{stats_data['totalExpense']:,}\n"
+                            f"Saldo do período: **{net:+,}**"
+                        ),
+                        inline=False,
+                    )
+
                 embed.set_thumbnail(url=target_user.display_avatar.url)
                 embed.set_footer(
                     text="Use /daily_coins para coletar suas moedas diárias!"
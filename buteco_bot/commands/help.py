@@ -85,9 +85,11 @@ def help_commands(bot):
             ("💰 **Comandos de Economia**", ""),
             ("/daily_coins", "Colete suas moedas diárias"),
             ("/fazer_transferencia <usuário>", "Transfira moedas para outro usuário"),
+            ("/transferir_varios <quantidade> <usuários...> [dividir]", "Transfira moedas para até 5 usuários de uma vez"),
             ("/extrato", "Veja seu histórico de transações"),
             ("/coin_history", "Veja seu histórico de coletas diárias"),
             ("/faria_limers", "Ranking dos usuários mais ricos"),
+            ("/grafico_patrimonio [usuário] [dias]", "Gráfico do saldo ao longo do tempo"),
             ("", ""),
             ("🎰 **Comandos de Apostas**", ""),
             ("/criar_evento", "Criar novo evento de aposta (Admin)"),
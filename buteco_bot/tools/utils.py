@@ -28,30 +28,43 @@ async def make_api_request(
 
 
 async def get_or_create_user(discord_id: str, username: str) -> Optional[dict]:
-    """Get existing user or create new one."""
+    """Get existing user or create new one, in a single client API call."""
     async with aiohttp.ClientSession() as session:
+        user_data = {"discordId": discord_id, "name": username}
         status, data = await make_api_request(
-            session, "GET", f"{CLIENT_API_URL}/client/discordId/{discord_id}"
+            session, "PUT", f"{CLIENT_API_URL}/client/ensure", user_data
         )
 
-        if status == 200:
+        if status in [200, 201]:
+            if status == 201:
+                logger.info(f"Created new user: {data}")
             return data
-        elif status == 404:
-            user_data = {"discordId": discord_id, "name": username}
-            logger.info(f"Creating new user with data: {user_data}")
-            status, data = await make_api_request(
-                session, "POST", f"{CLIENT_API_URL}/client/", user_data
-            )
-            logger.info(f"User creation response - Status: {status}, Data: {data}")
-            if status in [200, 201]:
-                return data
-            else:
-                logger.error(
-                    f"Failed to create user. Status: {status}, Response: {data}"
-                )
+        logger.error(f"Failed to get or create user. Status: {status}, Response: {data}")
     return None
 
 
+async def get_or_create_users(members) -> dict:
+    """Resolve several Discord members in one batch call; only unregistered ones are created.
+
+    Returns a dict from Discord ID to user (None when the user could not be created).
+    """
+    members = list({str(member.id): member for member in members}.values())
+    async with aiohttp.ClientSession() as session:
+        status, data = await make_api_request(
+            session, "POST", f"{CLIENT_API_URL}/client/batch",
+            {"discordIds": [str(member.id) for member in members]}
+        )
+    users = {}
+    if status == 200:
+        users = {user["discordId"]: user for user in data.get("clients", [])}
+    else:
+        logger.error(f"Failed to resolve users in batch. Status: {status}, Response: {data}")
+    for member in members:
+        if str(member.id) not in users:
+            users[str(member.id)] = await get_or_create_user(str(member.id), member.display_name)
+    return users
+
+
 def is_admin(user: discord.Member) -> bool:
     """Check if user has admin permissions."""
     return user.guild_permissions.administrator or user.guild_permissions.manage_guild
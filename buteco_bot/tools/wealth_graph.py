@@ -0,0 +1,35 @@
+import plotly.graph_objects as go
+
+class WealthGraph:
+    def create_figure(self, series, name):
+        """Create the net-worth-over-time figure from balance-api's daily series."""
+        days = [point["day"] for point in series]
+        balances = [point["balance"] for point in series]
+
+        fig = go.Figure()
+        fig.add_trace(
+            go.Scatter(
+                x=days,
+                y=balances,
+                mode="lines",
+                line=dict(color="royalblue", width=3, shape="hv"),
+                fill="tozeroy",
+                fillcolor="rgba(65, 105, 225, 0.15)",
+                showlegend=False,
+            )
+        )
+        fig.update_layout(
+            title=f"Patrimônio de {name}",
+            title_x=0.5,
+            xaxis_title="Dia",
+            yaxis_title="Moedas",
+            template="plotly_white",
+        )
+
+        return fig
+
+
+    def render_png(self, series, name):
+        """Render the figure to PNG bytes; blocking, so call it off the event loop."""
+        fig = self.create_figure(series, name)
+        return fig.to_image(format="png", width=1200, height=600, scale=2)
@@ -204,6 +204,55 @@ class PaginationView(discord.ui.View):
         self.stop()
 
 
+class CursorPaginationView(discord.ui.View):
+    """Pagination view that fetches each page on demand from a cursor-paginated API"""
+    
+    def __init__(self, fetch_page: Callable, first_page: discord.Embed, next_cursor: Optional[str], timeout: float = 180.0):
+        super().__init__(timeout=timeout)
+        self.fetch_page = fetch_page
+        # cursors[i] is the cursor that loads page i; page 0 needs none
+        self.cursors = [None]
+        self.next_cursor = next_cursor
+        self.current_page = 0
+        self.current_embed = first_page
+        self.update_buttons()
+    
+    def update_buttons(self):
+        """Update button states based on current page"""
+        self.prev_page.disabled = self.current_page == 0
+        self.next_page.disabled = self.next_cursor is None
+    
+    async def show_page(self, interaction: discord.Interaction, page: int):
+        """Fetch and display the given page"""
+        embed, next_cursor = await self.fetch_page(self.cursors[page], page)
+        if embed is None:
+            await interaction.response.send_message("❌ Falha ao carregar a página.", ephemeral=True)
+            return
+        self.current_page = page
+        self.current_embed = embed
+        self.next_cursor = next_cursor
+        self.update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="◀️", style=discord.ButtonStyle.primary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Go to previous page"""
+        await self.show_page(interaction, max(0, self.current_page - 1))
+    
+    @discord.ui.button(label="▶️", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Go to next page"""
+        if self.current_page + 1 == len(self.cursors):
+            self.cursors.append(self.next_cursor)
+        await self.show_page(interaction, self.current_page + 1)
+    
+    @discord.ui.button(label="🗑️", style=discord.ButtonStyle.danger)
+    async def delete(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Delete the message"""
+        await interaction.message.delete()
+        self.stop()
+
+
 class AdminActionsView(discord.ui.View):
     """Admin action buttons for bet management"""
     
@@ -1,13 +1,21 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, Depends
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text, select, or_
+from sqlalchemy.exc import IntegrityError
 from dotenv import load_dotenv
+from datetime import datetime
 import os
+import json
+import uuid
 import logging
 from models.User import User
 from models.UserCreate import UserCreate
 from models.UserUpdate import UserUpdate
+from models.ClientBatchRequest import ClientBatchRequest
+from shared.ttl_cache import TTLCache
+from shared.database import Database
 
 load_dotenv()
 
@@ -18,112 +26,335 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DB_MODE = os.getenv("DB_MODE", "sync")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+CLIENT_CACHE_TTL_SECONDS = float(os.getenv("CLIENT_CACHE_TTL_SECONDS", 300))
+CLIENT_CACHE_MAX_ENTRIES = int(os.getenv("CLIENT_CACHE_MAX_ENTRIES", 10000))
+CLIENT_LIST_MAX_LIMIT = 1000
+CLIENT_BATCH_MAX_KEYS = 1000
+CLIENT_STREAM_BATCH_SIZE = int(os.getenv("CLIENT_STREAM_BATCH_SIZE", 1000))
+
+database = Database(
+    DATABASE_URL,
+    mode=DB_MODE,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=DB_POOL_PRE_PING
+)
 
 app = FastAPI()
 
+async def get_db():
+    async with database.session() as session:
+        yield session
+
+CLIENT_COLUMNS = ("id", "discordId", "name", "createdAt", "updatedAt")
+
+# Client rows keyed by ("id", id) and ("discordId", discordId); only this process's writes invalidate
+# it, so with several workers another worker's update is seen once the entry expires
+client_cache = TTLCache(CLIENT_CACHE_TTL_SECONDS, CLIENT_CACHE_MAX_ENTRIES)
+
+def client_row(user: User) -> dict:
+    return {column: getattr(user, column) for column in CLIENT_COLUMNS}
+
+def cache_client(row: dict, version: int):
+    client_cache.set(("id", str(row["id"])), row, version)
+    client_cache.set(("discordId", row["discordId"]), row, version)
+
+def forget_client(row: dict):
+    client_cache.invalidate(("id", str(row["id"])))
+    client_cache.invalidate(("discordId", row["discordId"]))
+
+def client_fields(fields: Optional[str]) -> list:
+    """Columns named by a comma-separated fields parameter; every column when it is omitted."""
+    if not fields:
+        return list(CLIENT_COLUMNS)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CLIENT_COLUMNS]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}, expected some of {list(CLIENT_COLUMNS)}")
+    return names
+
+def ndjson_line(row) -> str:
+    return json.dumps(dict(row), default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value)) + "\n"
+
+async def stream_clients(names: list):
+    """Yield every client as NDJSON, fetched CLIENT_STREAM_BATCH_SIZE rows at a time off a server-side cursor."""
+    statement = select(*[getattr(User, name) for name in names]).order_by(User.id)
+    streamed = 0
+    async for rows in database.stream(statement, CLIENT_STREAM_BATCH_SIZE):
+        streamed += len(rows)
+        yield "".join(ndjson_line(row) for row in rows)
+    logger.info(f"Streamed {streamed} clients")
+
+# Insert the client unless its discordId exists, and return whichever row is there, in one statement
+ENSURE_CLIENT_SQL = text(
+    'WITH inserted AS ('
+    '  INSERT INTO "user" ("discordId", "name", "createdAt", "updatedAt") '
+    '  VALUES (:discord_id, :name, :now, :now) '
+    '  ON CONFLICT ("discordId") DO NOTHING '
+    '  RETURNING "id", "discordId", "name", "createdAt", "updatedAt", true AS "created"'
+    ') '
+    'SELECT * FROM inserted '
+    'UNION ALL SELECT "id", "discordId", "name", "createdAt", "updatedAt", false FROM "user" '
+    'WHERE "discordId" = :discord_id AND NOT EXISTS (SELECT 1 FROM inserted)'
+)
+
 @app.post("/client/")
-def register_client(user: UserCreate):
+async def register_client(user: UserCreate, session=Depends(get_db)):
     logger.info(f"Attempting to register new client with discordId: {user.discordId}")
-    db: Session = SessionLocal()
-    try:
+
+    def work(db: Session):
         logger.info(f"Checking if user already exists with discordId: {user.discordId}")
         existing = db.query(User).filter(User.discordId == user.discordId).first()
         if existing:
             logger.warning(f"User registration failed - user already exists: {user.discordId}")
             raise HTTPException(status_code=409, detail="User already registered")
-        
+
         logger.info(f"Creating new user with discordId: {user.discordId}")
         new_user = User(
             discordId=user.discordId,
             name=user.name
         )
         db.add(new_user)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # Registered concurrently between the check above and this insert
+            logger.warning(f"User registration failed - user already exists: {user.discordId}")
+            raise HTTPException(status_code=409, detail="User already registered")
         db.refresh(new_user)
         logger.info(f"Successfully registered new client: {new_user.id} ({user.discordId})")
-        return new_user
-    finally:
-        db.close()
+        return client_row(new_user)
+
+    return await session.run(work)
+
+# The cached endpoints below open a session only on a cache miss (database.run), so a hit
+# never checks out a connection or hops to the threadpool.
+
+@app.put("/client/ensure")
+async def ensure_client(user: UserCreate, response: Response):
+    """Get the client with this discordId, registering it first if needed (201 when created).
+
+    ON CONFLICT DO NOTHING makes concurrent first calls for the same user safe: one inserts,
+    the others get the existing row.
+    """
+    logger.info(f"Ensuring client with discordId: {user.discordId}")
+    cached = client_cache.get(("discordId", user.discordId))
+    if cached is not None:
+        return cached
+    version = client_cache.version
+
+    def work(db: Session):
+        params = {"discord_id": user.discordId, "name": user.name, "now": datetime.utcnow()}
+        row = db.execute(ENSURE_CLIENT_SQL, params).mappings().first()
+        if row is None:
+            # A concurrent ensure committed the row after this statement's snapshot was taken
+            row = db.execute(
+                text('SELECT "id", "discordId", "name", "createdAt", "updatedAt", false AS "created" '
+                     'FROM "user" WHERE "discordId" = :discord_id'),
+                params
+            ).mappings().one()
+        db.commit()
+        return dict(row)
+
+    row = await database.run(work)
+    if row["created"]:
+        response.status_code = 201
+        logger.info(f"Successfully registered new client: {row['id']} ({user.discordId})")
+    client = {column: row[column] for column in CLIENT_COLUMNS}
+    # Raw SQL results carry no column types, so asyncpg hands back a UUID object
+    client["id"] = str(client["id"])
+    cache_client(client, version)
+    return client
 
 @app.get("/client/")
-def get_all_clients():
-    logger.info("Fetching all clients")
-    db: Session = SessionLocal()
-    try:
-        users = db.query(User).all()
-        logger.info(f"Retrieved {len(users)} clients")
-        return users
-    finally:
-        db.close()
+async def get_all_clients(after_id: Optional[str] = None, limit: Optional[int] = None, fields: Optional[str] = None, stream: bool = False):
+    """List clients.
+
+    With after_id or limit, returns one page ordered by id plus the nextAfterId to pass back
+    (null on the last page); without either, every client in one list. stream=true sends every
+    client as NDJSON instead. fields picks the columns, e.g. fields=id,discordId,name.
+    """
+    names = client_fields(fields)
+    if stream:
+        logger.info(f"Streaming all clients (fields: {names})")
+        return StreamingResponse(stream_clients(names), media_type="application/x-ndjson")
+    if after_id is not None:
+        try:
+            uuid.UUID(after_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="after_id must be a client id")
+
+    def work(db: Session):
+        # Column tuples rather than ORM entities; id is always selected since pages are keyed on it
+        columns = [getattr(User, name) for name in names if name != "id"]
+        query = db.query(User.id, *columns)
+        if after_id is None and limit is None:
+            logger.info("Fetching all clients")
+            users = [{name: row._mapping[name] for name in names} for row in query.all()]
+            logger.info(f"Retrieved {len(users)} clients")
+            return users
+
+        page_size = max(1, min(limit or CLIENT_LIST_MAX_LIMIT, CLIENT_LIST_MAX_LIMIT))
+        logger.info(f"Fetching clients after {after_id} (limit: {page_size})")
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        rows = query.order_by(User.id).limit(page_size).all()
+        return {
+            "items": [{name: row._mapping[name] for name in names} for row in rows],
+            "nextAfterId": str(rows[-1].id) if len(rows) == page_size else None
+        }
+
+    return await database.run(work)
+
+@app.post("/client/batch")
+async def get_clients_batch(batch: ClientBatchRequest):
+    """Resolve many clients by id and/or discordId; cache misses are fetched with a single IN query."""
+    ids = list(dict.fromkeys(batch.ids))
+    discord_ids = list(dict.fromkeys(batch.discordIds))
+    if len(ids) + len(discord_ids) > CLIENT_BATCH_MAX_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {CLIENT_BATCH_MAX_KEYS} ids and discordIds per batch")
+    logger.info(f"Resolving batch of {len(ids)} ids and {len(discord_ids)} Discord IDs")
+
+    # Cache keys and results use the canonical uuid form, so any spelling of an id finds its client;
+    # malformed ids cannot match and would make Postgres reject the uuid comparison
+    canonical_ids = {}
+    for id in ids:
+        try:
+            canonical_ids[id] = str(uuid.UUID(id))
+        except ValueError:
+            pass
+
+    found = {}
+    missing_ids, missing_discord_ids = [], []
+    for id in dict.fromkeys(canonical_ids.values()):
+        cached = client_cache.get(("id", id))
+        if cached is not None:
+            found[str(cached["id"])] = cached
+        else:
+            missing_ids.append(id)
+    for discord_id in discord_ids:
+        cached = client_cache.get(("discordId", discord_id))
+        if cached is not None:
+            found[str(cached["id"])] = cached
+        else:
+            missing_discord_ids.append(discord_id)
+
+    if missing_ids or missing_discord_ids:
+        version = client_cache.version
+
+        def work(db: Session):
+            conditions = []
+            if missing_ids:
+                conditions.append(User.id.in_(missing_ids))
+            if missing_discord_ids:
+                conditions.append(User.discordId.in_(missing_discord_ids))
+            rows = db.query(*[getattr(User, name) for name in CLIENT_COLUMNS]).filter(or_(*conditions)).all()
+            return [dict(row._mapping) for row in rows]
+
+        for client in await database.run(work):
+            cache_client(client, version)
+            found[str(client["id"])] = client
+
+    clients = list(found.values())
+    found_discord_ids = {client["discordId"] for client in clients}
+    logger.info(f"Resolved {len(clients)} clients")
+    return {
+        "clients": clients,
+        "missingIds": [id for id in ids if canonical_ids.get(id) not in found],
+        "missingDiscordIds": [discord_id for discord_id in discord_ids if discord_id not in found_discord_ids]
+    }
+
+@app.get("/client/cache/stats")
+def get_cache_stats():
+    return client_cache.stats()
 
 @app.get("/client/{id}")
-def get_client(id: str):
+async def get_client(id: str):
     logger.info(f"Fetching client by ID: {id}")
-    db: Session = SessionLocal()
-    try:
+    cached = client_cache.get(("id", id))
+    if cached is not None:
+        return cached
+    version = client_cache.version
+
+    def work(db: Session):
         logger.info(f"Querying database for client with ID: {id}")
         user = db.query(User).filter(User.id == id).first()
-        if not user:
-            logger.warning(f"Client not found by ID: {id}")
-            raise HTTPException(status_code=404, detail="User not found")
-        logger.info(f"Successfully retrieved client: {user.id} ({user.discordId})")
-        return user
-    finally:
-        db.close()
+        return client_row(user) if user else None
+
+    row = await database.run(work)
+    if not row:
+        logger.warning(f"Client not found by ID: {id}")
+        raise HTTPException(status_code=404, detail="User not found")
+    logger.info(f"Successfully retrieved client: {row['id']} ({row['discordId']})")
+    cache_client(row, version)
+    return row
 
 @app.get("/client/discordId/{discord_id}")
-def get_client_by_discordId(discord_id: str):
+async def get_client_by_discordId(discord_id: str):
     logger.info(f"Fetching client by Discord ID: {discord_id}")
-    db: Session = SessionLocal()
-    try:
+    cached = client_cache.get(("discordId", discord_id))
+    if cached is not None:
+        return cached
+    version = client_cache.version
+
+    def work(db: Session):
         logger.info(f"Querying database for client with Discord ID: {discord_id}")
         user = db.query(User).filter(User.discordId == discord_id).first()
-        if not user:
-            logger.warning(f"Client not found by Discord ID: {discord_id}")
-            raise HTTPException(status_code=404, detail="User not found")
-        logger.info(f"Successfully retrieved client by Discord ID: {user.id} ({discord_id})")
-        return user
-    finally:
-        db.close()
+        return client_row(user) if user else None
+
+    row = await database.run(work)
+    if not row:
+        logger.warning(f"Client not found by Discord ID: {discord_id}")
+        raise HTTPException(status_code=404, detail="User not found")
+    logger.info(f"Successfully retrieved client by Discord ID: {row['id']} ({discord_id})")
+    cache_client(row, version)
+    return row
 
 @app.put("/client/{id}")
-def update_client(id: str, user: UserUpdate):
+async def update_client(id: str, user: UserUpdate, session=Depends(get_db)):
     logger.info(f"Updating client: {id}")
-    db: Session = SessionLocal()
-    try:
+
+    def work(db: Session):
         logger.info(f"Checking if client exists for update: {id}")
         existing_user = db.query(User).filter(User.id == id).first()
         if not existing_user:
             logger.warning(f"Cannot update - client not found: {id}")
             raise HTTPException(status_code=404, detail="User not found")
+        previous = client_row(existing_user)
         if user.discordId is not None:
             existing_user.discordId = user.discordId
         if user.name is not None:
             existing_user.name = user.name
         db.commit()
         db.refresh(existing_user)
-        logger.info(f"Successfully updated client: {id}")
-        return existing_user
-    finally:
-        db.close()
+        return previous, client_row(existing_user)
+
+    previous, updated = await session.run(work)
+    forget_client(previous)
+    logger.info(f"Successfully updated client: {id}")
+    return updated
 
 @app.delete("/client/{id}")
-def delete_client(id: str):
+async def delete_client(id: str, session=Depends(get_db)):
     logger.info(f"Deleting client: {id}")
-    db: Session = SessionLocal()
-    try:
+
+    def work(db: Session):
         user = db.query(User).filter(User.id == id).first()
         if not user:
             logger.warning(f"Cannot delete - client not found: {id}")
             raise HTTPException(status_code=404, detail="User not found")
+        previous = client_row(user)
         db.delete(user)
         db.commit()
-        logger.info(f"Successfully deleted client: {id}")
-        return {"detail": "User deleted"}
-    finally:
-        db.close()
+        return previous
+
+    forget_client(await session.run(work))
+    logger.info(f"Successfully deleted client: {id}")
+    return {"detail": "User deleted"}
 
 @app.get("/health")
 def health_check():
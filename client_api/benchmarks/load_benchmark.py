@@ -0,0 +1,100 @@
+"""Load test of GET /client/discordId/{id} with client_api in DB_MODE=sync and DB_MODE=async.
+
+Start two instances against the same database, one per mode. Disable the lookup cache so that
+every request reaches Postgres (otherwise both modes just serve from memory):
+
+    DB_MODE=sync  CLIENT_CACHE_MAX_ENTRIES=0 uvicorn api_service:app --port 5010
+    DB_MODE=async CLIENT_CACHE_MAX_ENTRIES=0 uvicorn api_service:app --port 5020
+
+then run (needs aiohttp):
+
+    python benchmarks/load_benchmark.py --sync-url http://localhost:5010 --async-url http://localhost:5020
+
+The users are registered first through PUT /client/ensure. Then --concurrency clients look up
+random ones for --duration seconds per mode, and the script reports requests per second and
+p50/p99 latency.
+"""
+import argparse
+import asyncio
+import random
+import time
+import aiohttp
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def seed(base_url, discord_ids, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ensure(session, discord_id):
+        async with semaphore:
+            async with session.put(f"{base_url}/client/ensure", json={
+                "discordId": discord_id, "name": f"load test {discord_id}"
+            }) as response:
+                await response.read()
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*[ensure(session, discord_id) for discord_id in discord_ids])
+
+
+async def client_loop(session, base_url, discord_ids, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        discord_id = random.choice(discord_ids)
+        started = time.perf_counter()
+        try:
+            async with session.get(f"{base_url}/client/discordId/{discord_id}") as response:
+                await response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+        except aiohttp.ClientError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(base_url, concurrency, duration, discord_ids):
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            client_loop(session, base_url, discord_ids, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", default="http://localhost:5010")
+    parser.add_argument("--async-url", default="http://localhost:5020")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--users", type=int, default=1000, help="distinct Discord IDs to spread lookups over")
+    args = parser.parse_args()
+
+    discord_ids = [f"loadtest-{i}" for i in range(args.users)]
+    await seed(args.sync_url.rstrip("/"), discord_ids, 50)
+    print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per mode, {args.users} users")
+    print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, base_url in (("sync", args.sync_url), ("async", args.async_url)):
+        result = await run(base_url.rstrip("/"), args.concurrency, args.duration, discord_ids)
+        print(f"{mode:<6} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import List
+
+class ClientBatchRequest(BaseModel):
+    ids: List[str] = []
+    discordIds: List[str] = []
@@ -1,5 +1,6 @@
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from datetime import datetime
 
@@ -7,7 +8,7 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = "user"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
     discordId = Column(String, unique=True, nullable=False)
     name = Column(String, nullable=False)
     createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
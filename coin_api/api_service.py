@@ -8,6 +8,7 @@ import requests
 import logging
 import uuid
 from datetime import date, timedelta
+from shared.http_retry import post_with_retry
 from models.DailyClaim import DailyClaim, Base
 from models.DailyClaimRequest import DailyClaimRequest
 from sqlalchemy import func
@@ -24,6 +25,8 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 BALANCE_API_URL = os.getenv("BALANCE_API_URL")
 CLIENT_API_URL = os.getenv("CLIENT_API_URL")
 DAILY_COINS_AMOUNT = int(os.getenv("DAILY_COINS_AMOUNT", 100))
+BALANCE_API_RETRIES = int(os.getenv("BALANCE_API_RETRIES", 3))
+BALANCE_API_TIMEOUT = float(os.getenv("BALANCE_API_TIMEOUT", 5))
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -60,13 +63,17 @@ def claim_daily_coins(request: DailyClaimRequest):
             raise HTTPException(status_code=503, detail="Client service unavailable")
         
         try:
-            add_balance_response = requests.post(
+            # One key per client per day: a retried or duplicated claim can never credit twice
+            add_balance_response = post_with_retry(
                 f"{BALANCE_API_URL}/balance/add",
-                json={
+                {
                     "clientId": request.clientId,
                     "amount": DAILY_COINS_AMOUNT,
                     "description": "Daily coins reward"
-                }
+                },
+                f"daily-coins:{request.clientId}:{today.isoformat()}",
+                retries=BALANCE_API_RETRIES,
+                timeout=BALANCE_API_TIMEOUT
             )
             
             if add_balance_response.status_code != 200:
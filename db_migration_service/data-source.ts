@@ -6,6 +6,14 @@ import { BetEvent } from "./src/entity/BetEvent";
 import { UserBet } from "./src/entity/UserBet";
 import { PoliticalPosition } from "./src/entity/PoliticalPosition";
 import { Challenge } from "./src/entity/Challenge";
+import { ClientBalance } from "./src/entity/ClientBalance";
+import { BalanceOperationArchive } from "./src/entity/BalanceOperationArchive";
+import { BalanceCheckpoint } from "./src/entity/BalanceCheckpoint";
+import { IdempotencyKey } from "./src/entity/IdempotencyKey";
+import { ReconciliationCheckpoint } from "./src/entity/ReconciliationCheckpoint";
+import { ReconciliationIssue } from "./src/entity/ReconciliationIssue";
+import { BalanceTransaction } from "./src/entity/BalanceTransaction";
+import { AccrualRun } from "./src/entity/AccrualRun";
 import * as dotenv from "dotenv";
 dotenv.config();
 
@@ -19,7 +27,7 @@ export default new DataSource({
     database: process.env.DB_NAME,
     synchronize: false,
     logging: false,
-    entities: [User, BalanceOperation, DailyClaim, BetEvent, UserBet, PoliticalPosition, Challenge],
+    entities: [User, BalanceOperation, DailyClaim, BetEvent, UserBet, PoliticalPosition, Challenge, ClientBalance, BalanceOperationArchive, BalanceCheckpoint, IdempotencyKey, ReconciliationCheckpoint, ReconciliationIssue, BalanceTransaction, AccrualRun],
     migrations: ["src/migration/**/*.ts"],
     subscribers: [],
 });
@@ -0,0 +1,38 @@
+import { Entity, PrimaryColumn, Column, CreateDateColumn } from "typeorm";
+
+// An interest or tax run applied by balance_api; its operations carry the reference "accrual:<id>"
+@Entity({ name: "accrual_run" })
+export class AccrualRun {
+    @PrimaryColumn({ type: "text" })
+    id!: string;
+
+    @Column({ type: "text" })
+    kind!: string;
+
+    @Column({ type: "integer" })
+    rateBps!: number;
+
+    @Column({ type: "integer" })
+    threshold!: number;
+
+    @Column({ type: "text" })
+    description!: string;
+
+    @Column({ type: "text", default: "running" })
+    status!: string;
+
+    @Column({ type: "uuid", nullable: true })
+    lastClientId!: string | null;
+
+    @Column({ type: "integer", default: 0 })
+    operations!: number;
+
+    @Column({ type: "bigint", default: 0 })
+    totalAmount!: string;
+
+    @CreateDateColumn()
+    createdAt!: Date;
+
+    @Column({ type: "timestamp", nullable: true })
+    completedAt!: Date | null;
+}
@@ -0,0 +1,25 @@
+import { Entity, PrimaryColumn, Column, UpdateDateColumn } from "typeorm";
+
+@Entity({ name: "balance_checkpoint" })
+export class BalanceCheckpoint {
+    @PrimaryColumn({ type: "uuid" })
+    clientId!: string;
+
+    @Column({ type: "bigint", default: 0 })
+    balance!: string;
+
+    @Column({ type: "bigint", default: 0 })
+    totalIncome!: string;
+
+    @Column({ type: "bigint", default: 0 })
+    totalExpense!: string;
+
+    @Column({ type: "integer", default: 0 })
+    operationCount!: number;
+
+    @Column({ type: "timestamp" })
+    cutoff!: Date;
+
+    @UpdateDateColumn()
+    updatedAt!: Date;
+}
@@ -1,6 +1,10 @@
-import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn } from "typeorm";
+import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn, Index } from "typeorm";
 
 @Entity({ name: "balance_operation" })
+@Index("IDX_balance_operation_client_created", ["clientId", "createdAt"])
+@Index("IDX_balance_operation_reference", ["reference"], { where: '"reference" IS NOT NULL' })
+@Index("IDX_balance_operation_transaction", ["transactionId"], { where: '"transactionId" IS NOT NULL' })
+@Index("IDX_balance_operation_seq", ["seq"])
 export class BalanceOperation {
     @PrimaryGeneratedColumn("uuid")
     id!: string;
@@ -14,9 +18,25 @@ export class BalanceOperation {
     @Column({ type: "text" })
     description!: string;
 
-    @CreateDateColumn()
+    // Part of the primary key because the table is range-partitioned by month on createdAt
+    @CreateDateColumn({ primary: true })
     createdAt!: Date;
 
     @UpdateDateColumn()
     updatedAt!: Date;
+
+    // Change-feed position, assigned by balance_api's sequencer once the writing transaction has finished
+    @Column({ type: "bigint", nullable: true })
+    seq!: string | null;
+
+    @Column({ type: "bigint", default: () => "pg_current_xact_id()::text::bigint" })
+    txid!: string;
+
+    // What the operation belongs to, e.g. "bet:42:payout"; set by the calling service
+    @Column({ type: "text", nullable: true })
+    reference!: string | null;
+
+    // The balance_transaction this operation is a leg of, for transfers
+    @Column({ type: "uuid", nullable: true })
+    transactionId!: string | null;
 }
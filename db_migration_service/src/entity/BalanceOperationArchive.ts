@@ -0,0 +1,40 @@
+import { Entity, PrimaryColumn, Column, Index } from "typeorm";
+
+@Entity({ name: "balance_operation_archive" })
+@Index("IDX_balance_operation_archive_client_created", ["clientId", "createdAt"])
+@Index("IDX_balance_operation_archive_reference", ["reference"], { where: '"reference" IS NOT NULL' })
+@Index("IDX_balance_operation_archive_transaction", ["transactionId"], { where: '"transactionId" IS NOT NULL' })
+@Index("IDX_balance_operation_archive_seq", ["seq"], { unique: true })
+export class BalanceOperationArchive {
+    @PrimaryColumn({ type: "uuid" })
+    id!: string;
+
+    @Column({ type: "uuid" })
+    clientId!: string;
+
+    @Column({ type: "integer" })
+    amount!: number;
+
+    @Column({ type: "text" })
+    description!: string;
+
+    @Column({ type: "timestamp" })
+    createdAt!: Date;
+
+    @Column({ type: "timestamp" })
+    updatedAt!: Date;
+
+    @Column({ type: "bigint", nullable: true })
+    seq!: string | null;
+
+    @Column({ type: "bigint" })
+    txid!: string;
+
+    // What the operation belongs to, e.g. "bet:42:payout"; set by the calling service
+    @Column({ type: "text", nullable: true })
+    reference!: string | null;
+
+    // The balance_transaction this operation is a leg of, for transfers
+    @Column({ type: "uuid", nullable: true })
+    transactionId!: string | null;
+}
@@ -0,0 +1,21 @@
+import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, Index } from "typeorm";
+
+// One transfer between clients; its legs are the balance operations carrying its id as transactionId
+@Entity({ name: "balance_transaction" })
+@Index("IDX_balance_transaction_sender_created", ["senderId", "createdAt"])
+export class BalanceTransaction {
+    @PrimaryGeneratedColumn("uuid")
+    id!: string;
+
+    @Column({ type: "uuid" })
+    senderId!: string;
+
+    @Column({ type: "integer" })
+    amount!: number;
+
+    @Column({ type: "text" })
+    description!: string;
+
+    @CreateDateColumn()
+    createdAt!: Date;
+}
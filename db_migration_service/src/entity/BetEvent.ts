@@ -1,6 +1,7 @@
-import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn } from "typeorm";
+import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn, Index } from "typeorm";
 
 @Entity({ name: "bet_event" })
+@Index("IDX_bet_event_updated", ["updatedAt", "id"])
 export class BetEvent {
     @PrimaryGeneratedColumn()
     id!: number;
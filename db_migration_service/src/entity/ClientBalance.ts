@@ -0,0 +1,14 @@
+import { Entity, PrimaryColumn, Column, UpdateDateColumn, Index } from "typeorm";
+
+@Entity({ name: "client_balance" })
+@Index("IDX_client_balance_balance", ["balance"])
+export class ClientBalance {
+    @PrimaryColumn({ type: "uuid" })
+    clientId!: string;
+
+    @Column({ type: "bigint", default: 0 })
+    balance!: string;
+
+    @UpdateDateColumn()
+    updatedAt!: Date;
+}
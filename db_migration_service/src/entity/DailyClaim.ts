@@ -1,6 +1,7 @@
-import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn } from "typeorm";
+import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn, Index } from "typeorm";
 
 @Entity({ name: "daily_claim" })
+@Index("IDX_daily_claim_created", ["createdAt", "id"])
 export class DailyClaim {
     @PrimaryGeneratedColumn("uuid")
     id!: string;
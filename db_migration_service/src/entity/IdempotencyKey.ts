@@ -0,0 +1,26 @@
+import { Entity, PrimaryColumn, Column, CreateDateColumn, Index } from "typeorm";
+
+@Entity({ name: "idempotency_key" })
+@Index("IDX_idempotency_key_expires", ["expiresAt"])
+export class IdempotencyKey {
+    @PrimaryColumn({ type: "text" })
+    key!: string;
+
+    @Column({ type: "text" })
+    endpoint!: string;
+
+    @Column({ type: "text" })
+    requestHash!: string;
+
+    @Column({ type: "integer", nullable: true })
+    statusCode?: number;
+
+    @Column({ type: "jsonb", nullable: true })
+    response?: object;
+
+    @CreateDateColumn()
+    createdAt!: Date;
+
+    @Column({ type: "timestamp" })
+    expiresAt!: Date;
+}
@@ -0,0 +1,13 @@
+import { Entity, PrimaryColumn, Column, UpdateDateColumn } from "typeorm";
+
+@Entity({ name: "reconciliation_checkpoint" })
+export class ReconciliationCheckpoint {
+    @PrimaryColumn({ type: "text" })
+    check!: string;
+
+    @Column({ type: "jsonb" })
+    position!: object;
+
+    @UpdateDateColumn()
+    updatedAt!: Date;
+}
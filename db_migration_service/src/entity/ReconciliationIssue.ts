@@ -0,0 +1,20 @@
+import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, Unique } from "typeorm";
+
+@Entity({ name: "reconciliation_issue" })
+@Unique("UQ_reconciliation_issue_check_subject", ["check", "subject"])
+export class ReconciliationIssue {
+    @PrimaryGeneratedColumn()
+    id!: number;
+
+    @Column({ type: "text" })
+    check!: string;
+
+    @Column({ type: "text" })
+    subject!: string;
+
+    @Column({ type: "jsonb" })
+    detail!: object;
+
+    @CreateDateColumn()
+    detectedAt!: Date;
+}
@@ -1,6 +1,7 @@
-import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn } from "typeorm";
+import { Entity, PrimaryGeneratedColumn, Column, CreateDateColumn, UpdateDateColumn, Unique } from "typeorm";
 
 @Entity({ name: "user_bet" })
+@Unique("UQ_user_bet_event_user", ["betEventId", "userId"])
 export class UserBet {
     @PrimaryGeneratedColumn()
     id!: number;
@@ -16,6 +17,9 @@ export class UserBet {
 
     @Column()
     amount!: number;
+
+    @Column({ type: "text", default: "placed" })
+    status!: string;
     
     @CreateDateColumn()
     createdAt!: Date;
@@ -0,0 +1,25 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddClientBalance1792195200000 implements MigrationInterface {
+    name = 'AddClientBalance1792195200000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`
+            CREATE TABLE "client_balance" (
+                "clientId" uuid NOT NULL,
+                "balance" bigint NOT NULL DEFAULT 0,
+                "updatedAt" TIMESTAMP NOT NULL DEFAULT now(),
+                CONSTRAINT "PK_client_balance_clientId" PRIMARY KEY ("clientId")
+            )
+        `);
+        // One-shot backfill; balance_api keeps the table current from here on
+        await queryRunner.query(`
+            INSERT INTO "client_balance" ("clientId", "balance", "updatedAt")
+            SELECT "clientId", SUM("amount"), now() FROM "balance_operation" GROUP BY "clientId"
+        `);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`DROP TABLE "client_balance"`);
+    }
+}
@@ -0,0 +1,41 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddLedgerCompaction1792195300000 implements MigrationInterface {
+    name = 'AddLedgerCompaction1792195300000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`
+            CREATE TABLE "balance_operation_archive" (
+                "id" uuid NOT NULL,
+                "clientId" uuid NOT NULL,
+                "amount" integer NOT NULL,
+                "description" text NOT NULL,
+                "createdAt" TIMESTAMP NOT NULL,
+                "updatedAt" TIMESTAMP NOT NULL,
+                CONSTRAINT "PK_balance_operation_archive_id" PRIMARY KEY ("id")
+            )
+        `);
+        await queryRunner.query(`
+            CREATE TABLE "balance_checkpoint" (
+                "clientId" uuid NOT NULL,
+                "balance" bigint NOT NULL DEFAULT 0,
+                "totalIncome" bigint NOT NULL DEFAULT 0,
+                "totalExpense" bigint NOT NULL DEFAULT 0,
+                "operationCount" integer NOT NULL DEFAULT 0,
+                "cutoff" TIMESTAMP NOT NULL,
+                "updatedAt" TIMESTAMP NOT NULL DEFAULT now(),
+                CONSTRAINT "PK_balance_checkpoint_clientId" PRIMARY KEY ("clientId")
+            )
+        `);
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_client_created" ON "balance_operation" ("clientId", "createdAt")`);
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_archive_client_created" ON "balance_operation_archive" ("clientId", "createdAt")`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        // Put archived operations back so the ledger stays complete without the checkpoints
+        await queryRunner.query(`INSERT INTO "balance_operation" SELECT * FROM "balance_operation_archive"`);
+        await queryRunner.query(`DROP INDEX "IDX_balance_operation_client_created"`);
+        await queryRunner.query(`DROP TABLE "balance_checkpoint"`);
+        await queryRunner.query(`DROP TABLE "balance_operation_archive"`);
+    }
+}
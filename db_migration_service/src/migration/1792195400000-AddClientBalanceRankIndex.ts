@@ -0,0 +1,13 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddClientBalanceRankIndex1792195400000 implements MigrationInterface {
+    name = 'AddClientBalanceRankIndex1792195400000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`CREATE INDEX "IDX_client_balance_balance" ON "client_balance" ("balance")`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`DROP INDEX "IDX_client_balance_balance"`);
+    }
+}
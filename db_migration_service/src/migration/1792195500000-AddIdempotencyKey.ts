@@ -0,0 +1,25 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddIdempotencyKey1792195500000 implements MigrationInterface {
+    name = 'AddIdempotencyKey1792195500000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`
+            CREATE TABLE "idempotency_key" (
+                "key" text NOT NULL,
+                "endpoint" text NOT NULL,
+                "requestHash" text NOT NULL,
+                "statusCode" integer,
+                "response" jsonb,
+                "createdAt" TIMESTAMP NOT NULL DEFAULT now(),
+                "expiresAt" TIMESTAMP NOT NULL,
+                CONSTRAINT "PK_idempotency_key_key" PRIMARY KEY ("key")
+            )
+        `);
+        await queryRunner.query(`CREATE INDEX "IDX_idempotency_key_expires" ON "idempotency_key" ("expiresAt")`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`DROP TABLE "idempotency_key"`);
+    }
+}
@@ -0,0 +1,39 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddBalanceChangeFeed1792195600000 implements MigrationInterface {
+    name = 'AddBalanceChangeFeed1792195600000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`CREATE SEQUENCE "balance_operation_seq"`);
+        for (const table of ["balance_operation_archive", "balance_operation"]) {
+            await queryRunner.query(`ALTER TABLE "${table}" ADD "seq" bigint`);
+            await queryRunner.query(`ALTER TABLE "${table}" ADD "txid" bigint`);
+        }
+        // Existing history gets sequence numbers in (createdAt, id) order, archive first since it is older
+        for (const table of ["balance_operation_archive", "balance_operation"]) {
+            await queryRunner.query(`
+                UPDATE "${table}" o SET "seq" = s."seq", "txid" = 0
+                FROM (
+                    SELECT "id", nextval('balance_operation_seq') AS "seq"
+                    FROM (SELECT "id" FROM "${table}" ORDER BY "createdAt", "id") ordered
+                ) s
+                WHERE o."id" = s."id"
+            `);
+            await queryRunner.query(`ALTER TABLE "${table}" ALTER COLUMN "txid" SET NOT NULL`);
+            await queryRunner.query(`CREATE UNIQUE INDEX "IDX_${table}_seq" ON "${table}" ("seq")`);
+        }
+        // New rows record the writing transaction; the sequencer numbers them once it has finished
+        await queryRunner.query(`ALTER TABLE "balance_operation" ALTER COLUMN "txid" SET DEFAULT pg_current_xact_id()::text::bigint`);
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_unsequenced" ON "balance_operation" ("txid", "id") WHERE "seq" IS NULL`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`DROP INDEX "IDX_balance_operation_unsequenced"`);
+        for (const table of ["balance_operation", "balance_operation_archive"]) {
+            await queryRunner.query(`DROP INDEX "IDX_${table}_seq"`);
+            await queryRunner.query(`ALTER TABLE "${table}" DROP COLUMN "txid"`);
+            await queryRunner.query(`ALTER TABLE "${table}" DROP COLUMN "seq"`);
+        }
+        await queryRunner.query(`DROP SEQUENCE "balance_operation_seq"`);
+    }
+}
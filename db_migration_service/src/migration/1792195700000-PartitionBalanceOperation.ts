@@ -0,0 +1,98 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class PartitionBalanceOperation1792195700000 implements MigrationInterface {
+    name = 'PartitionBalanceOperation1792195700000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`ALTER TABLE "balance_operation" RENAME TO "balance_operation_unpartitioned"`);
+        // Partitioned tables need the partition key in every unique constraint, hence ("id", "createdAt")
+        await queryRunner.query(`
+            CREATE TABLE "balance_operation" (
+                "id" uuid NOT NULL DEFAULT uuid_generate_v4(),
+                "clientId" uuid NOT NULL,
+                "amount" integer NOT NULL,
+                "description" text NOT NULL,
+                "createdAt" TIMESTAMP NOT NULL DEFAULT now(),
+                "updatedAt" TIMESTAMP NOT NULL DEFAULT now(),
+                "seq" bigint,
+                "txid" bigint NOT NULL DEFAULT pg_current_xact_id()::text::bigint,
+                CONSTRAINT "PK_balance_operation_id_created" PRIMARY KEY ("id", "createdAt")
+            ) PARTITION BY RANGE ("createdAt")
+        `);
+        // Catches rows for months nobody created a partition for; balance_api's maintenance keeps it empty
+        await queryRunner.query(`CREATE TABLE "balance_operation_default" PARTITION OF "balance_operation" DEFAULT`);
+        // Creates the month's partition if missing, moving any rows for it out of the default partition.
+        // Used here and by balance_api's partition maintenance.
+        await queryRunner.query(`
+            CREATE FUNCTION balance_operation_ensure_partition(month date) RETURNS boolean AS $$
+            DECLARE
+                start_at timestamp := date_trunc('month', month);
+                end_at timestamp := date_trunc('month', month) + interval '1 month';
+                partition_name text := 'balance_operation_p' || to_char(month, 'YYYYMM');
+            BEGIN
+                IF to_regclass(partition_name) IS NOT NULL THEN
+                    RETURN false;
+                END IF;
+                EXECUTE format('CREATE TABLE %I (LIKE balance_operation INCLUDING DEFAULTS)', partition_name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM balance_operation_default WHERE "createdAt" >= %L AND "createdAt" < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    start_at, end_at, partition_name
+                );
+                EXECUTE format(
+                    'ALTER TABLE balance_operation ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, start_at, end_at
+                );
+                RETURN true;
+            END
+            $$ LANGUAGE plpgsql
+        `);
+        // One partition per month of existing history, through three months ahead
+        await queryRunner.query(`
+            SELECT balance_operation_ensure_partition(month::date)
+            FROM generate_series(
+                date_trunc('month', COALESCE((SELECT MIN("createdAt") FROM "balance_operation_unpartitioned"), now())),
+                date_trunc('month', now()) + interval '3 months',
+                interval '1 month'
+            ) month
+        `);
+        await queryRunner.query(`
+            INSERT INTO "balance_operation" ("id", "clientId", "amount", "description", "createdAt", "updatedAt", "seq", "txid")
+            SELECT "id", "clientId", "amount", "description", "createdAt", "updatedAt", "seq", "txid"
+            FROM "balance_operation_unpartitioned"
+        `);
+        await queryRunner.query(`DROP TABLE "balance_operation_unpartitioned"`);
+        // Indexes are created after the copy; partitions attached later inherit them
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_client_created" ON "balance_operation" ("clientId", "createdAt")`);
+        // seq comes from a sequence, so it stays unique without a (partition-key-including) unique index
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_seq" ON "balance_operation" ("seq")`);
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_unsequenced" ON "balance_operation" ("txid", "id") WHERE "seq" IS NULL`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`ALTER TABLE "balance_operation" RENAME TO "balance_operation_partitioned"`);
+        await queryRunner.query(`
+            CREATE TABLE "balance_operation" (
+                "id" uuid NOT NULL DEFAULT uuid_generate_v4(),
+                "clientId" uuid NOT NULL,
+                "amount" integer NOT NULL,
+                "description" text NOT NULL,
+                "createdAt" TIMESTAMP NOT NULL DEFAULT now(),
+                "updatedAt" TIMESTAMP NOT NULL DEFAULT now(),
+                "seq" bigint,
+                "txid" bigint NOT NULL DEFAULT pg_current_xact_id()::text::bigint,
+                CONSTRAINT "PK_8cb82ba3c5dd568479da6ddab04" PRIMARY KEY ("id")
+            )
+        `);
+        await queryRunner.query(`
+            INSERT INTO "balance_operation" ("id", "clientId", "amount", "description", "createdAt", "updatedAt", "seq", "txid")
+            SELECT "id", "clientId", "amount", "description", "createdAt", "updatedAt", "seq", "txid"
+            FROM "balance_operation_partitioned"
+        `);
+        await queryRunner.query(`DROP TABLE "balance_operation_partitioned"`);
+        await queryRunner.query(`DROP FUNCTION balance_operation_ensure_partition(date)`);
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_client_created" ON "balance_operation" ("clientId", "createdAt")`);
+        await queryRunner.query(`CREATE UNIQUE INDEX "IDX_balance_operation_seq" ON "balance_operation" ("seq")`);
+        await queryRunner.query(`CREATE INDEX "IDX_balance_operation_unsequenced" ON "balance_operation" ("txid", "id") WHERE "seq" IS NULL`);
+    }
+}
@@ -0,0 +1,48 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddReconciliation1792195800000 implements MigrationInterface {
+    name = 'AddReconciliation1792195800000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        // What an operation belongs to (e.g. "bet:42:payout"), so reconciliation can find it by index
+        for (const table of ["balance_operation", "balance_operation_archive"]) {
+            await queryRunner.query(`ALTER TABLE "${table}" ADD "reference" text`);
+            await queryRunner.query(`CREATE INDEX "IDX_${table}_reference" ON "${table}" ("reference") WHERE "reference" IS NOT NULL`);
+        }
+        await queryRunner.query(`
+            CREATE TABLE "reconciliation_checkpoint" (
+                "check" text NOT NULL,
+                "position" jsonb NOT NULL,
+                "updatedAt" TIMESTAMP NOT NULL DEFAULT now(),
+                CONSTRAINT "PK_reconciliation_checkpoint_check" PRIMARY KEY ("check")
+            )
+        `);
+        await queryRunner.query(`
+            CREATE TABLE "reconciliation_issue" (
+                "id" SERIAL NOT NULL,
+                "check" text NOT NULL,
+                "subject" text NOT NULL,
+                "detail" jsonb NOT NULL,
+                "detectedAt" TIMESTAMP NOT NULL DEFAULT now(),
+                CONSTRAINT "PK_reconciliation_issue_id" PRIMARY KEY ("id"),
+                CONSTRAINT "UQ_reconciliation_issue_check_subject" UNIQUE ("check", "subject")
+            )
+        `);
+        // Keyset walks and per-event lookups done by the reconciliation checks
+        await queryRunner.query(`CREATE INDEX "IDX_daily_claim_created" ON "daily_claim" ("createdAt", "id")`);
+        await queryRunner.query(`CREATE INDEX "IDX_bet_event_updated" ON "bet_event" ("updatedAt", "id")`);
+        await queryRunner.query(`CREATE INDEX "IDX_user_bet_event" ON "user_bet" ("betEventId")`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`DROP INDEX "IDX_user_bet_event"`);
+        await queryRunner.query(`DROP INDEX "IDX_bet_event_updated"`);
+        await queryRunner.query(`DROP INDEX "IDX_daily_claim_created"`);
+        await queryRunner.query(`DROP TABLE "reconciliation_issue"`);
+        await queryRunner.query(`DROP TABLE "reconciliation_checkpoint"`);
+        for (const table of ["balance_operation", "balance_operation_archive"]) {
+            await queryRunner.query(`DROP INDEX "IDX_${table}_reference"`);
+            await queryRunner.query(`ALTER TABLE "${table}" DROP COLUMN "reference"`);
+        }
+    }
+}
@@ -0,0 +1,54 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddBalanceTransaction1792195900000 implements MigrationInterface {
+    name = 'AddBalanceTransaction1792195900000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`
+            CREATE TABLE "balance_transaction" (
+                "id" uuid NOT NULL DEFAULT uuid_generate_v4(),
+                "senderId" uuid NOT NULL,
+                "amount" integer NOT NULL,
+                "description" text NOT NULL,
+                "createdAt" TIMESTAMP NOT NULL DEFAULT now(),
+                CONSTRAINT "PK_balance_transaction_id" PRIMARY KEY ("id")
+            )
+        `);
+        await queryRunner.query(`CREATE INDEX "IDX_balance_transaction_sender_created" ON "balance_transaction" ("senderId", "createdAt")`);
+        // Both legs of a transfer point at its balance_transaction row
+        for (const table of ["balance_operation", "balance_operation_archive"]) {
+            await queryRunner.query(`ALTER TABLE "${table}" ADD "transactionId" uuid`);
+            await queryRunner.query(`CREATE INDEX "IDX_${table}_transaction" ON "${table}" ("transactionId") WHERE "transactionId" IS NOT NULL`);
+        }
+        // Existing transfers recorded since the change feed was added can be paired by the id of the
+        // database transaction that wrote them; the sender leg's id becomes the transaction id.
+        // Older legs (txid 0) have nothing reliable to pair on and stay unlinked.
+        const legs = `
+            SELECT "id", "clientId", "amount", "description", "createdAt", "txid" FROM "balance_operation"
+            UNION ALL SELECT "id", "clientId", "amount", "description", "createdAt", "txid" FROM "balance_operation_archive"
+        `;
+        await queryRunner.query(`
+            INSERT INTO "balance_transaction" ("id", "senderId", "amount", "description", "createdAt")
+            SELECT "id", "clientId", -"amount", substring("description" from position(': ' in "description") + 2), "createdAt"
+            FROM (${legs}) o
+            WHERE "txid" <> 0 AND "amount" < 0 AND "description" LIKE 'Transaction to %'
+        `);
+        for (const table of ["balance_operation", "balance_operation_archive"]) {
+            await queryRunner.query(`
+                UPDATE "${table}" o SET "transactionId" = t."id"
+                FROM "balance_transaction" t JOIN (${legs}) s ON s."id" = t."id"
+                WHERE o."txid" = s."txid"
+                AND (o."id" = s."id" OR o."description" LIKE 'Transaction from ' || s."clientId" || ': %')
+            `);
+        }
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        for (const table of ["balance_operation", "balance_operation_archive"]) {
+            await queryRunner.query(`DROP INDEX "IDX_${table}_transaction"`);
+            await queryRunner.query(`ALTER TABLE "${table}" DROP COLUMN "transactionId"`);
+        }
+        await queryRunner.query(`DROP INDEX "IDX_balance_transaction_sender_created"`);
+        await queryRunner.query(`DROP TABLE "balance_transaction"`);
+    }
+}
@@ -0,0 +1,29 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddAccrualRun1792196000000 implements MigrationInterface {
+    name = 'AddAccrualRun1792196000000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        // One row per interest/tax run; lastClientId is how far a run got, so it can resume after a failure
+        await queryRunner.query(`
+            CREATE TABLE "accrual_run" (
+                "id" text NOT NULL,
+                "kind" text NOT NULL,
+                "rateBps" integer NOT NULL,
+                "threshold" integer NOT NULL,
+                "description" text NOT NULL,
+                "status" text NOT NULL DEFAULT 'running',
+                "lastClientId" uuid,
+                "operations" integer NOT NULL DEFAULT 0,
+                "totalAmount" bigint NOT NULL DEFAULT 0,
+                "createdAt" TIMESTAMP NOT NULL DEFAULT now(),
+                "completedAt" TIMESTAMP,
+                CONSTRAINT "PK_accrual_run_id" PRIMARY KEY ("id")
+            )
+        `);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`DROP TABLE "accrual_run"`);
+    }
+}
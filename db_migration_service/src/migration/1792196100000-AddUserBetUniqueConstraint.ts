@@ -0,0 +1,17 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddUserBetUniqueConstraint1792196100000 implements MigrationInterface {
+    name = 'AddUserBetUniqueConstraint1792196100000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        // One bet per user and event, enforced by the database so two concurrent requests cannot both insert.
+        // Led by betEventId, it also serves the per-event lookups IDX_user_bet_event was for.
+        await queryRunner.query(`ALTER TABLE "user_bet" ADD CONSTRAINT "UQ_user_bet_event_user" UNIQUE ("betEventId", "userId")`);
+        await queryRunner.query(`DROP INDEX "IDX_user_bet_event"`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`CREATE INDEX "IDX_user_bet_event" ON "user_bet" ("betEventId")`);
+        await queryRunner.query(`ALTER TABLE "user_bet" DROP CONSTRAINT "UQ_user_bet_event_user"`);
+    }
+}
@@ -0,0 +1,62 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class DropBalanceOperationDefaultPartition1792196200000 implements MigrationInterface {
+    name = 'DropBalanceOperationDefaultPartition1792196200000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        // DETACH PARTITION ... CONCURRENTLY, which balance_api archives months with, is not allowed while
+        // the table has a default partition. Rows that landed there first get a month partition of their own.
+        await queryRunner.query(`
+            SELECT balance_operation_ensure_partition(month::date)
+            FROM (SELECT DISTINCT date_trunc('month', "createdAt") AS month FROM "balance_operation_default") months
+        `);
+        await queryRunner.query(`DROP TABLE "balance_operation_default"`);
+        // Without a default partition there are no rows to move, so a new month is created in place
+        await queryRunner.query(`
+            CREATE OR REPLACE FUNCTION balance_operation_ensure_partition(month date) RETURNS boolean AS $$
+            DECLARE
+                start_at timestamp := date_trunc('month', month);
+                end_at timestamp := date_trunc('month', month) + interval '1 month';
+                partition_name text := 'balance_operation_p' || to_char(month, 'YYYYMM');
+            BEGIN
+                IF to_regclass(partition_name) IS NOT NULL THEN
+                    RETURN false;
+                END IF;
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF balance_operation FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, start_at, end_at
+                );
+                RETURN true;
+            END
+            $$ LANGUAGE plpgsql
+        `);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`
+            CREATE OR REPLACE FUNCTION balance_operation_ensure_partition(month date) RETURNS boolean AS $$
+            DECLARE
+                start_at timestamp := date_trunc('month', month);
+                end_at timestamp := date_trunc('month', month) + interval '1 month';
+                partition_name text := 'balance_operation_p' || to_char(month, 'YYYYMM');
+            BEGIN
+                IF to_regclass(partition_name) IS NOT NULL THEN
+                    RETURN false;
+                END IF;
+                EXECUTE format('CREATE TABLE %I (LIKE balance_operation INCLUDING DEFAULTS)', partition_name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM balance_operation_default WHERE "createdAt" >= %L AND "createdAt" < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    start_at, end_at, partition_name
+                );
+                EXECUTE format(
+                    'ALTER TABLE balance_operation ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, start_at, end_at
+                );
+                RETURN true;
+            END
+            $$ LANGUAGE plpgsql
+        `);
+        await queryRunner.query(`CREATE TABLE "balance_operation_default" PARTITION OF "balance_operation" DEFAULT`);
+    }
+}
@@ -0,0 +1,15 @@
+import { MigrationInterface, QueryRunner } from "typeorm";
+
+export class AddUserBetStatus1792196300000 implements MigrationInterface {
+    name = 'AddUserBetStatus1792196300000'
+
+    public async up(queryRunner: QueryRunner): Promise<void> {
+        // A bet is committed as 'pending' before its stake is debited and becomes 'placed' once the debit is confirmed.
+        // Existing rows were written after their debit succeeded, so they default to 'placed'.
+        await queryRunner.query(`ALTER TABLE "user_bet" ADD "status" text NOT NULL DEFAULT 'placed'`);
+    }
+
+    public async down(queryRunner: QueryRunner): Promise<void> {
+        await queryRunner.query(`ALTER TABLE "user_bet" DROP COLUMN "status"`);
+    }
+}
@@ -0,0 +1,6 @@
+"""Python code shared by the FastAPI services.
+
+Copied into the images of the services that use it (balance_api, client_api, bet_api and coin_api,
+whose Docker build context is the repository root) next to the service code; run the services
+locally with the repository root on PYTHONPATH.
+"""
@@ -0,0 +1,95 @@
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class SyncDatabaseSession:
+    """Runs session work on the Starlette threadpool with a psycopg2 connection."""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+
+class AsyncDatabaseSession:
+    """Runs session work on the event loop; asyncpg does the I/O without tying up a thread."""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn, *args, **kwargs):
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+
+class Database:
+    """Engine and session factory for either sync (psycopg2) or async (asyncpg) mode.
+
+    Endpoint code is written once against the regular Session API as a function ``fn(db, ...)``
+    and handed to ``run``; in async mode SQLAlchemy drives it through ``AsyncSession.run_sync``.
+    """
+
+    def __init__(self, url: str, mode: str = "sync", pool_size: int = 5, max_overflow: int = 10, pool_pre_ping: bool = True):
+        if mode not in ("sync", "async"):
+            raise ValueError(f"Unknown database mode: {mode}")
+        self.mode = mode
+        pool_options = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_pre_ping": pool_pre_ping}
+        if mode == "async":
+            # Only async mode needs greenlet (sqlalchemy[asyncio]) and asyncpg
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+            self.engine = create_async_engine(self.async_url(url), **pool_options)
+            self.session_factory = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        else:
+            self.engine = create_engine(url, **pool_options)
+            self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+    @staticmethod
+    def async_url(url: str) -> str:
+        """postgresql://... (as used by the sync services) -> postgresql+asyncpg://..."""
+        scheme, rest = url.split("://", 1)
+        return f"{scheme.split('+')[0]}+asyncpg://{rest}"
+
+    @asynccontextmanager
+    async def session(self):
+        if self.mode == "async":
+            async with self.session_factory() as session:
+                yield AsyncDatabaseSession(session)
+        else:
+            session = self.session_factory()
+            try:
+                yield SyncDatabaseSession(session)
+            finally:
+                # close() rolls back on the connection, so keep it off the event loop
+                await run_in_threadpool(session.close)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(db, *args, **kwargs) in a session of its own."""
+        async with self.session() as session:
+            return await session.run(fn, *args, **kwargs)
+
+    async def stream(self, statement, batch_size: int = 1000):
+        """Yield the rows of statement as lists of mappings, batch_size at a time, over a server-side cursor.
+
+        Opens its own session rather than using a request-scoped one, since a streamed response
+        keeps reading after the endpoint function has returned.
+        """
+        statement = statement.execution_options(yield_per=batch_size)
+        if self.mode == "async":
+            async with self.session_factory() as session:
+                result = await session.stream(statement)
+                async for partition in result.mappings().partitions():
+                    yield partition
+        else:
+            session = self.session_factory()
+            try:
+                result = await run_in_threadpool(session.execute, statement)
+                partitions = result.mappings().partitions()
+                while True:
+                    partition = await run_in_threadpool(next, partitions, None)
+                    if partition is None:
+                        break
+                    yield partition
+            finally:
+                await run_in_threadpool(session.close)
@@ -0,0 +1,24 @@
+import logging
+import time
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+def post_with_retry(url: str, payload: dict, idempotency_key: str, retries: int = 3, timeout: float = 5) -> requests.Response:
+    """POST with exponential backoff; the Idempotency-Key makes every retry safe to replay"""
+    delay = 0.2
+    for attempt in range(1, retries + 1):
+        try:
+            response = requests.post(
+                url, json=payload, headers={"Idempotency-Key": idempotency_key}, timeout=timeout
+            )
+            if response.status_code < 500 or attempt == retries:
+                return response
+            logger.warning(f"POST {url} returned {response.status_code} (attempt {attempt}), retrying")
+        except requests.exceptions.RequestException as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"POST {url} failed (attempt {attempt}): {e}, retrying")
+        time.sleep(delay)
+        delay *= 2